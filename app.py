@@ -1,29 +1,249 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, flash, Response, stream_with_context, g, abort, send_file
+import click
+import csv
+import hashlib
+import io
+import math
+import json
 import os
+import sys
+import threading
+import time
 import uuid
-from werkzeug.utils import secure_filename
+from itsdangerous import BadSignature, URLSafeTimedSerializer
 from config import Config
-from utils.recommender import FashionRecommender
+from utils.admission import AdmissionRejected
+from utils.jobs import JobManager, JobQueueFull
+from utils.cache import ResponseCache
+from utils.batch import run_batch
+from utils.upload_store import UploadStore
+from utils.media import MediaStore
+from utils.result_store import ResultStore
+from utils import metrics
 
 # Initialize Flask app
 app = Flask(__name__)
 app.config.from_object(Config)
 
-# Ensure upload folder exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Content-addressed store for uploads shown on results pages
+upload_store = UploadStore(
+    app.config['UPLOAD_FOLDER'],
+    max_age=app.config['UPLOAD_MAX_AGE'],
+    max_bytes=app.config['UPLOAD_MAX_BYTES']
+)
+upload_store.start_sweeper(app.config['UPLOAD_SWEEP_INTERVAL'])
+# Resized JPEG/WebP versions of those uploads, served from /media/<digest>/<variant>
+media_store = MediaStore(upload_store, extensions=app.config['ALLOWED_EXTENSIONS'],
+                         quality=app.config['MEDIA_QUALITY'])
 
-# Initialize recommender (fallback to demo mode if no API key)
-try:
-    recommender = FashionRecommender(app.config['GROQ_API_KEY'])
-except Exception as e:
-    print(f"Warning: Could not initialize Groq client: {e}")
-    print("Running in demo mode without AI recommendations")
-    recommender = None
+# The recommender (PIL, NumPy, Groq/httpx clients) is built on first use so
+# workers boot fast and /api/health answers before model clients are ready
+_recommender = None
+_recommender_state = 'pending'  # pending -> ready | demo
+_recommender_lock = threading.Lock()
+
+def get_recommender():
+    """
+    Return the shared FashionRecommender, building it on first use.
+    Returns None in demo mode (no API key or client initialization failed).
+    """
+    global _recommender, _recommender_state
+    if _recommender_state != 'pending':
+        return _recommender
+    
+    with _recommender_lock:
+        if _recommender_state == 'pending':
+            # Initialize recommender (fallback to demo mode if no API key)
+            try:
+                from utils.recommender import FashionRecommender
+                _recommender = FashionRecommender(app.config['GROQ_API_KEY'])
+                _recommender_state = 'ready'
+            except Exception as e:
+                print(f"Warning: Could not initialize Groq client: {e}")
+                print("Running in demo mode without AI recommendations")
+                _recommender_state = 'demo'
+    return _recommender
+
+def warm_up():
+    """Build the recommender in the background (e.g. from a post-fork hook)"""
+    threading.Thread(target=get_recommender, name="styleai-warm-up", daemon=True).start()
+
+# Streaming uploads are handed to their event stream in a signed token (the
+# upload is already on disk), so the stream can be served by any worker
+stream_tokens = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='stream-analysis')
+
+# Finished results (and their on-demand sections) behind /results/<id> and the JSON API
+result_store = ResultStore(app.config['RESULT_DB_PATH'], ttl=app.config['RESULT_TTL'])
+result_store.start_pruner(app.config['RESULT_PRUNE_INTERVAL'])
+
+# Background pool for job-mode analyses; job status is kept in the result store
+jobs = JobManager(
+    result_store,
+    max_workers=app.config['JOB_WORKERS'],
+    max_pending=app.config['JOB_QUEUE_SIZE'],
+    ttl=app.config['JOB_TTL']
+)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are measured up to their first byte
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            route=route, method=request.method, status=response.status_code
+        )
+    return response
+
+def more_sections(result):
+    """Secondary sections the results page can still request for a stored analysis"""
+    # A class attribute, so pages served before the recommender is built list them too
+    from utils.groq_client import GroqStylist
+    if 'analysis_id' not in result:
+        return []
+    present = result.get('ai_recommendations', {})
+    return [name for name in GroqStylist.SECTION_SCHEMAS if name not in present]
+
+def render_results(result, quick_mode):
+    """Render results.html, timing the template stage"""
+    with metrics.timed('template_render'):
+        return render_template('results.html', result=result, quick_mode=quick_mode,
+                               more_sections=[] if quick_mode else more_sections(result))
+
+@app.template_filter('swatch_color')
+def swatch_color(name):
+    """CSS color for a palette color name"""
+    from utils.color_index import color_hex
+    return color_hex(name) or name.lower().replace(' ', '-')
+
+def palette_swatches(palette):
+    """swatch_color for every name in a palette, for swatches drawn in the browser"""
+    return {color: swatch_color(color) for colors in palette.values() for color in colors}
+
+@app.template_global()
+def media_url(image_path, variant):
+    """URL of a derivative of an uploaded image (the original for files not named by digest)"""
+    digest, _ = MediaStore.split(image_path)
+    if digest is None:
+        return url_for('static', filename=image_path)
+    return url_for('media', digest=digest, variant=variant)
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def request_flag(name, default=False):
+    """Boolean form/query flag such as async=1 or stream=1"""
+    flag = request.values.get(name)
+    if flag is None:
+        return default
+    return flag.lower() in ('1', 'true', 'yes')
+
+def wants_async():
+    """Job mode is the configured default, or requested with async=1"""
+    return request_flag('async', app.config['ANALYZE_ASYNC'])
+
+def latency_budget():
+    """Per-request latency budget in seconds (latency_budget=8), or None for the configured default"""
+    try:
+        budget = float(request.values.get('latency_budget', ''))
+    except ValueError:
+        return None
+    # The router clamps it to ROUTING_LATENCY_BUDGET
+    return budget if math.isfinite(budget) and budget > 0 else None
+
+def wants_json():
+    return request.accept_mimetypes.best == 'application/json'
+
+def sse_response(events):
+    """Serialize (event, payload) pairs from the recommender as Server-Sent Events"""
+    def generate():
+        for event, payload in events:
+            if event == 'token':
+                payload = {"text": payload}
+            elif event == 'skin_analysis':
+                payload = dict(payload, color_hex=palette_swatches(payload.get('color_palette') or {}))
+            elif event == 'section':
+                payload = {"name": payload[0], "value": payload[1]}
+            elif event == 'error':
+                payload = {"message": payload}
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stored_events(result_id, result):
+    """Replay a stored result as the events of the stream that produced it"""
+    yield 'skin_analysis', result['skin_analysis']
+    if result.get('color_match'):
+        yield 'color_match', result['color_match']
+    for section in result['ai_recommendations'].items():
+        yield 'section', section
+    result['result_url'] = url_for('show_result', result_id=result_id)
+    yield 'done', result
+
+def file_extension(filename):
+    return filename.rsplit('.', 1)[1].lower()
+
+def make_etag(*parts):
+    """Validator derived from the request inputs and the prompt version"""
+    key = ResponseCache.make_key(app.config['PROMPT_VERSION'], *parts)
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+def content_etag(payload):
+    """Strong validator derived from a stored payload itself"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()).hexdigest()[:32]
+
+def not_modified(etag, cache_control, weak=False):
+    """A 304 response if the client already holds etag, otherwise None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def cacheable_json(payload, etag, cache_control, weak=False):
+    response = jsonify(payload)
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+def result_id_for(*inputs):
+    """Deterministic result id, so resubmitting the same inputs finds the stored result"""
+    return make_etag('result', *inputs)
+
+def save_result(result, kind='analysis', result_id=None):
+    """
+    Persist a finished result and tag it with its id. Fallback and degraded-route
+    results get a one-off id so the same inputs are tried upstream again next time.
+    """
+    if (result_id is None or result.get('error') or 'error' in result.get('ai_recommendations', {})
+            or result.get('routing', {}).get('degraded')):
+        result_id = uuid.uuid4().hex
+    result['analysis_id'] = result_id
+    result_store.put(result_id, result, kind)
+    return result_id
+
+def run_analysis(image, filename, gender, dress_code, preferences, budget=None):
+    """Process an uploaded image (bytes or path), attach its display path and store it"""
+    recommender = get_recommender()
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    result = recommender.process_user_request(image, gender, dress_code, preferences, latency_budget=budget)
+    result['image_path'] = f"uploads/{filename}"
+    save_result(result, result_id=result_id_for(filename, gender, dress_code, preferences))
+    return result
+
+def run_analysis_job(*args):
+    """run_analysis for the job pool, which records only the stored result's id"""
+    return run_analysis(*args)['analysis_id']
+
 @app.route('/')
 def index():
     """Main page"""
@@ -34,6 +254,7 @@ def index():
 @app.route('/quick-recommend', methods=['POST'])
 def quick_recommend():
     """Get quick recommendations without image upload"""
+    recommender = get_recommender()
     try:
         skin_tone = request.form.get('skin_tone')
         gender = request.form.get('gender')
@@ -64,7 +285,7 @@ def quick_recommend():
                     "dress_code": dress_code
                 }
             }
-            return render_template('results.html', result=result, quick_mode=True)
+            return render_results(result, quick_mode=True)
         
         # Validate inputs
         is_valid, message = recommender.validate_inputs(gender, dress_code)
@@ -72,11 +293,27 @@ def quick_recommend():
             flash(message, 'error')
             return redirect(url_for('index'))
         
-        # Get recommendations
-        result = recommender.get_quick_recommendations(skin_tone, gender, dress_code)
+        # Same inputs, same stored result: repeat submissions never reach the model
+        result_id = result_id_for('quick', skin_tone, gender, dress_code)
+        if result_id in result_store:
+            return redirect(url_for('show_result', result_id=result_id), code=303)
         
-        return render_template('results.html', result=result, quick_mode=True)
+        if request_flag('stream'):
+            # Render the page shell now; tokens arrive over /api/stream/tips, which stores the result
+            stream_url = url_for('stream_tips', skin_tone=skin_tone, gender=gender, dress_code=dress_code)
+            return render_template('stream.html', stream_url=stream_url, quick_mode=True,
+                                   user_inputs={"gender": gender, "dress_code": dress_code})
         
+        result = recommender.get_quick_recommendations(skin_tone, gender, dress_code)
+        tips = result['ai_recommendations'].get('basic_tips')
+        if 'error' in result or recommender.groq_stylist.is_fallback_tips(tips):
+            # Worth retrying later, so not stored under the shared id
+            return render_results(result, quick_mode=True)
+        save_result(result, kind='quick', result_id=result_id)
+        return redirect(url_for('show_result', result_id=result_id), code=303)
+        
+    except AdmissionRejected:
+        raise
     except Exception as e:
         flash(f"Error processing request: {str(e)}", 'error')
         return redirect(url_for('index'))
@@ -84,6 +321,7 @@ def quick_recommend():
 @app.route('/analyze', methods=['POST'])
 def analyze_image():
     """Analyze uploaded image and provide recommendations"""
+    recommender = get_recommender()
     try:
         # Get form data
         gender = request.form.get('gender')
@@ -101,12 +339,12 @@ def analyze_image():
             return redirect(url_for('index'))
         
         if file and allowed_file(file.filename):
-            # Generate unique filename
-            filename = secure_filename(f"{uuid.uuid4()}_{file.filename}")
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
+            # Keep the upload in memory; it is only written to disk for display
+            image_data = file.read()
+            extension = file_extension(file.filename)
             
             if recommender is None:
+                filename = upload_store.save(image_data, extension)
                 # Demo mode response
                 result = {
                     "skin_analysis": {
@@ -139,7 +377,7 @@ def analyze_image():
                     },
                     "image_path": f"uploads/{filename}"
                 }
-                return render_template('results.html', result=result, quick_mode=False)
+                return render_results(result, quick_mode=False)
             
             try:
                 # Validate inputs
@@ -148,36 +386,402 @@ def analyze_image():
                     flash(message, 'error')
                     return redirect(url_for('index'))
                 
-                # Process image and get recommendations
-                result = recommender.process_user_request(file_path, gender, dress_code, preferences)
+                # Uploads are content-addressed, so resubmitting the same photo and
+                # inputs finds the stored result instead of calling the model again
+                filename = upload_store.save(image_data, extension)
+                result_id = result_id_for(filename, gender, dress_code, preferences)
+                if result_id in result_store:
+                    if wants_json():
+                        return redirect(url_for('analysis_api', analysis_id=result_id), code=303)
+                    return redirect(url_for('show_result', result_id=result_id), code=303)
+                
+                if wants_async():
+                    # Enqueue and return immediately; the worker pool does the slow part.
+                    # Checked before stream=1, which the browser adds to every submit.
+                    try:
+                        job_id = jobs.submit(run_analysis_job, image_data, filename, gender, dress_code,
+                                             preferences, latency_budget())
+                    except JobQueueFull as e:
+                        if wants_json():
+                            return jsonify({"error": str(e)}), 503
+                        flash(str(e), 'error')
+                        return redirect(url_for('index'))
+                    
+                    if wants_json():
+                        return jsonify({
+                            "job_id": job_id,
+                            "status": "queued",
+                            "status_url": url_for('job_api', job_id=job_id)
+                        }), 202
+                    return redirect(url_for('job_status', job_id=job_id))
+                
+                if request_flag('stream'):
+                    # Render the page shell now; sections arrive over /api/stream/analyze/<token>.
+                    # The page shows the upload anyway, so the stream reads it back from
+                    # the store rather than holding the bytes in memory meanwhile.
+                    token = stream_tokens.dumps({
+                        "filename": filename,
+                        "gender": gender,
+                        "dress_code": dress_code,
+                        "preferences": preferences,
+                        "latency_budget": latency_budget()
+                    })
+                    return render_template('stream.html', quick_mode=False,
+                                           stream_url=url_for('stream_analysis', token=token),
+                                           more_sections=list(recommender.groq_stylist.SECTION_SCHEMAS),
+                                           image_path=f"uploads/{filename}",
+                                           user_inputs={"gender": gender, "dress_code": dress_code})
                 
-                # Add image path for display
-                result['image_path'] = f"uploads/{filename}"
+                # Process image in memory, then Post/Redirect/Get to the stored result
+                result = run_analysis(image_data, filename, gender, dress_code, preferences, latency_budget())
+                result_id = result['analysis_id']
                 
-                return render_template('results.html', result=result, quick_mode=False)
+                if wants_json():
+                    response = jsonify(result)
+                    response.status_code = 201
+                    response.headers['Location'] = url_for('analysis_api', analysis_id=result_id)
+                    return response
+                return redirect(url_for('show_result', result_id=result_id), code=303)
                 
+            except AdmissionRejected:
+                raise
             except Exception as e:
-                # Clean up uploaded file on error
-                if os.path.exists(file_path):
-                    os.remove(file_path)
                 flash(f"Error processing image: {str(e)}", 'error')
                 return redirect(url_for('index'))
         else:
             flash('Invalid file type. Please upload PNG, JPG, JPEG, or GIF files.', 'error')
             return redirect(url_for('index'))
             
+    except AdmissionRejected:
+        raise
     except Exception as e:
         flash(f"Error processing request: {str(e)}", 'error')
         return redirect(url_for('index'))
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Results page for a job-mode analysis; shows a progress page until done"""
+    job = jobs.get(job_id)
+    if job is None:
+        flash('Analysis not found or expired', 'error')
+        return redirect(url_for('index'))
+    
+    if job['status'] == 'done':
+        return redirect(url_for('show_result', result_id=job['result_id']))
+    if job['status'] == 'failed':
+        flash(f"Error processing image: {job['error']}", 'error')
+        return redirect(url_for('index'))
+    
+    return render_template('processing.html', job=job)
+
+@app.route('/results/<result_id>')
+def show_result(result_id):
+    """A stored result page: shareable, and repeat views never reach the model"""
+    kind, result = result_store.get(result_id)
+    if result is None:
+        flash('Results not found or expired', 'error')
+        return redirect(url_for('index'))
+    
+    return render_results(result, quick_mode=kind == 'quick')
+
+@app.route('/media/<digest>/<variant>')
+def media(digest, variant):
+    """
+    Resized derivative of an upload, rendered on first request. The URL is
+    content-addressed, so browsers and CDNs may keep it forever.
+    """
+    path, mimetype = media_store.derivative(digest, variant)
+    if path is None:
+        abort(404)
+    
+    response = send_file(path, mimetype=mimetype, etag=f"{digest}.{variant}", conditional=True)
+    response.headers['Cache-Control'] = f"public, max-age={app.config['MEDIA_MAX_AGE']}, immutable"
+    return response
+
+@app.route('/api/jobs/<job_id>')
+def job_api(job_id):
+    """Job status and, once finished, the analysis result"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    if job['status'] == 'done':
+        job['result'] = result_store.get(job['result_id'])[1]
+        job['result_url'] = url_for('analysis_api', analysis_id=job['result_id'])
+    return jsonify(job)
+
+@app.route('/api/stream/analyze/<token>')
+def stream_analysis(token):
+    """Server-Sent Events for a streaming image analysis, described by a signed token"""
+    recommender = get_recommender()
+    try:
+        pending = stream_tokens.loads(token, max_age=app.config['STREAM_PENDING_TTL'])
+    except BadSignature:
+        pending = None
+    if (pending is None or recommender is None
+            or not os.path.exists(upload_store.path(pending['filename']))):
+        return jsonify({"error": "Stream not found or expired"}), 404
+    
+    stored_id = result_id_for(pending['filename'], pending['gender'], pending['dress_code'], pending['preferences'])
+    
+    def events():
+        # EventSource reconnects, and reloads before the page swapped its URL, reuse the stored result
+        _, stored = result_store.get(stored_id)
+        if stored is not None:
+            yield from stored_events(stored_id, stored)
+            return
+        
+        for event, payload in recommender.stream_user_request(
+            upload_store.path(pending['filename']), pending['gender'], pending['dress_code'],
+            pending['preferences'], latency_budget=pending['latency_budget']
+        ):
+            if event == 'done':
+                payload['image_path'] = f"uploads/{pending['filename']}"
+                result_id = save_result(payload, result_id=stored_id)
+                # Lets the page swap its URL for the stored result
+                payload['result_url'] = url_for('show_result', result_id=result_id)
+            yield event, payload
+    
+    return sse_response(events())
+
+@app.route('/api/stream/tips')
+def stream_tips():
+    """Server-Sent Events for quick recommendation tips"""
+    recommender = get_recommender()
+    skin_tone = request.args.get('skin_tone')
+    gender = request.args.get('gender')
+    dress_code = request.args.get('dress_code')
+    
+    if recommender is None:
+        return jsonify({"error": "AI recommendations are not configured"}), 503
+    if skin_tone not in app.config['SKIN_TONES']:
+        return jsonify({"error": f"Invalid skin tone. Choose from: {', '.join(app.config['SKIN_TONES'])}"}), 400
+    is_valid, message = recommender.validate_inputs(gender, dress_code)
+    if not is_valid:
+        return jsonify({"error": message}), 400
+    
+    stored_id = result_id_for('quick', skin_tone, gender, dress_code)
+    
+    def events():
+        _, stored = result_store.get(stored_id)
+        if stored is not None:
+            yield from stored_events(stored_id, stored)
+            return
+        
+        for event, payload in recommender.stream_quick_recommendations(skin_tone, gender, dress_code):
+            if event == 'done' and not recommender.groq_stylist.is_fallback_tips(
+                    payload['ai_recommendations'].get('basic_tips')):
+                result_id = save_result(payload, kind='quick', result_id=stored_id)
+                # Lets the page swap its URL for the stored result
+                payload['result_url'] = url_for('show_result', result_id=result_id)
+            yield event, payload
+    
+    return sse_response(events())
+
+@app.route('/api/v1/recommendations')
+def recommendations_api():
+    """
+    Quick recommendations as JSON. The answer depends only on the query and
+    PROMPT_VERSION, so it is publicly cacheable under a weak ETag and a
+    matching If-None-Match is answered with 304 before anything is generated.
+    """
+    recommender = get_recommender()
+    skin_tone = request.args.get('skin_tone')
+    gender = request.args.get('gender')
+    dress_code = request.args.get('dress_code')
+    
+    if recommender is None:
+        return jsonify({"error": "AI recommendations are not configured"}), 503
+    if skin_tone not in app.config['SKIN_TONES']:
+        return jsonify({"error": f"Invalid skin tone. Choose from: {', '.join(app.config['SKIN_TONES'])}"}), 400
+    is_valid, message = recommender.validate_inputs(gender, dress_code)
+    if not is_valid:
+        return jsonify({"error": message}), 400
+    
+    etag = make_etag('recommendations', skin_tone, gender, dress_code)
+    max_age = app.config['API_CACHE_MAX_AGE']
+    cache_control = f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+    response = not_modified(etag, cache_control, weak=True)
+    if response is not None:
+        return response
+    
+    result = recommender.get_quick_recommendations(skin_tone, gender, dress_code)
+    tips = result['ai_recommendations'].get('basic_tips')
+    if 'error' in result or recommender.groq_stylist.is_fallback_tips(tips):
+        # Never let a degraded answer be cached under the stable ETag
+        response = jsonify(result)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    return cacheable_json(result, etag, cache_control, weak=True)
+
+@app.route('/api/v1/analyses/<analysis_id>')
+def analysis_api(analysis_id):
+    """
+    A finished image analysis. Results never change, so they are cached
+    privately under an ETag of the stored payload (an id can be reused for a
+    new result once the old one expires)
+    """
+    _, result = result_store.get(analysis_id)
+    if result is None:
+        return jsonify({"error": "Analysis not found or expired"}), 404
+    
+    etag = content_etag(result)
+    cache_control = f"private, max-age={app.config['RESULT_TTL']}, immutable"
+    response = not_modified(etag, cache_control)
+    if response is not None:
+        return response
+    
+    return cacheable_json(result, etag, cache_control)
+
+@app.route('/api/v1/analyses/<analysis_id>/sections')
+def analysis_sections_api(analysis_id):
+    """
+    Secondary sections (?names=accessories,makeup_tips; default all) for a stored
+    analysis. Missing sections are generated in parallel by the text model from
+    the first-pass analysis and kept, so each one is generated at most once.
+    """
+    _, result = result_store.get(analysis_id)
+    if result is None:
+        return jsonify({"error": "Analysis not found or expired"}), 404
+    recommender = get_recommender()
+    if recommender is None:
+        return jsonify({"error": "AI recommendations are not configured"}), 503
+    
+    available = recommender.groq_stylist.SECTION_SCHEMAS
+    names = [name for name in request.args.get('names', '').split(',') if name] or list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        return jsonify({"error": f"Unknown sections: {', '.join(unknown)}. Choose from: {', '.join(available)}"}), 400
+    
+    sections, missing = {}, []
+    for name in names:
+        # Results reused from before the split may already include the section
+        value = result['ai_recommendations'].get(name)
+        if value is None:
+            value = result_store.get_section(analysis_id, name)
+        if value is None:
+            missing.append(name)
+        else:
+            sections[name] = value
+    
+    cache_control = f"private, max-age={app.config['RESULT_TTL']}, immutable"
+    payload = {"analysis_id": analysis_id, "sections": sections}
+    if not missing:
+        # Everything is stored already, so the client may hold this exact payload
+        response = not_modified(content_etag(payload), cache_control)
+        if response is not None:
+            return response
+    
+    errors = {}
+    if missing:
+        generated, errors = recommender.generate_sections(result, missing)
+        for name, value in generated.items():
+            result_store.put_section(analysis_id, name, value)
+            sections[name] = value
+    
+    if errors:
+        payload["errors"] = errors
+        response = jsonify(payload)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    return cacheable_json(payload, content_etag(payload), cache_control)
+
+@app.route('/api/batch-analyze', methods=['POST'])
+def batch_analyze():
+    """
+    Analyze many images in one request.
+    Multipart fields: one or more "images" files, default "gender" / "dress_code" /
+    "preferences", and an optional "items" JSON list of per-image overrides
+    (same order as the files). With stream=1 results are returned as
+    newline-delimited JSON in completion order.
+    """
+    recommender = get_recommender()
+    if recommender is None:
+        return jsonify({"error": "AI recommendations are not configured"}), 503
+    
+    files = request.files.getlist('images')
+    if not files:
+        return jsonify({"error": "No images provided"}), 400
+    if len(files) > app.config['BATCH_MAX_ITEMS']:
+        return jsonify({"error": f"Too many images (max {app.config['BATCH_MAX_ITEMS']})"}), 400
+    
+    try:
+        overrides = json.loads(request.form.get('items') or '[]')
+    except ValueError:
+        return jsonify({"error": "items must be a JSON list"}), 400
+    if not isinstance(overrides, list):
+        return jsonify({"error": "items must be a JSON list"}), 400
+    
+    defaults = {
+        "gender": request.form.get('gender'),
+        "dress_code": request.form.get('dress_code'),
+        "preferences": request.form.get('preferences', '')
+    }
+    items = []
+    for index, file in enumerate(files):
+        item = dict(defaults, id=file.filename or index)
+        if index < len(overrides) and isinstance(overrides[index], dict):
+            item.update(overrides[index])
+        if not allowed_file(file.filename or ''):
+            item['error'] = 'Invalid file type. Please upload PNG, JPG, JPEG, or GIF files.'
+        else:
+            item['image'] = io.BytesIO(file.read())
+        items.append(item)
+    
+    records = run_batch(recommender, items, max_workers=app.config['BATCH_WORKERS'])
+    
+    if request_flag('stream'):
+        def generate():
+            for record in records:
+                yield json.dumps(record) + "\n"
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    results = sorted(records, key=lambda record: record['index'])
+    failed = sum(1 for record in results if record['status'] == 'error')
+    return jsonify({
+        "results": results,
+        "summary": {"total": len(results), "succeeded": len(results) - failed, "failed": failed}
+    })
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of this worker's metrics"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
+    try:
+        # Shared by every worker on the node, like the job records themselves
+        job_counts = jobs.stats()
+    except Exception as e:
+        print(f"Warning: Could not count jobs: {e}")
+        job_counts = None
     return jsonify({
         "status": "healthy",
-        "service": "StyleAI Fashion Recommender"
+        "service": "StyleAI Fashion Recommender",
+        "recommender": _recommender_state,
+        "upstream": (_recommender.transport.breaker.state if _recommender
+                     else "pending" if _recommender_state == 'pending' else "disabled"),
+        "routing": _recommender.router.snapshot() if _recommender else None,
+        "jobs": job_counts
     })
 
+@app.errorhandler(AdmissionRejected)
+def upstream_busy(error):
+    """Requests shed by admission control: 503 with Retry-After, or a flash message for pages"""
+    retry_after = max(1, int(math.ceil(error.retry_after)))
+    if wants_json() or request.path.startswith('/api/'):
+        response = jsonify({"error": str(error), "retry_after": retry_after})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    
+    flash(f"{error} (about {retry_after}s)", 'error')
+    return redirect(url_for('index'))
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('index.html'), 404
@@ -186,6 +790,63 @@ def not_found(error):
 def internal_error(error):
     return render_template('index.html'), 500
 
+@app.cli.command('warm-cache')
+@click.option('--force', is_flag=True, help='Regenerate entries that are already cached')
+@click.option('--workers', default=4, show_default=True, help='Concurrent upstream requests')
+def warm_cache(force, workers):
+    """Pre-generate quick recommendation tips for every input combination"""
+    recommender = get_recommender()
+    if recommender is None:
+        raise click.ClickException("Groq client is not configured (GROQ_API_KEY missing?)")
+    
+    fetched = recommender.warm_tips_cache(force=force, max_workers=workers)
+    click.echo(f"Warmed {fetched} combinations ({len(recommender.tips_cache)} cached)")
+
+@app.cli.command('batch-analyze')
+@click.argument('paths', nargs=-1, type=click.Path(exists=True))
+@click.option('--manifest', type=click.File('r'),
+              help='CSV with columns path, gender, dress_code and optional preferences, id')
+@click.option('--gender', help='Default gender for every image')
+@click.option('--dress-code', help='Default dress code for every image')
+@click.option('--preferences', default='', help='Default style preferences')
+@click.option('--workers', default=app.config['BATCH_WORKERS'], show_default=True,
+              help='Concurrent analyses')
+@click.option('--output', type=click.File('w'), default='-', help='NDJSON output file (default stdout)')
+def batch_analyze_command(paths, manifest, gender, dress_code, preferences, workers, output):
+    """Analyze image files or directories and write one JSON line per image"""
+    recommender = get_recommender()
+    if recommender is None:
+        raise click.ClickException("Groq client is not configured (GROQ_API_KEY missing?)")
+    
+    defaults = {"gender": gender, "dress_code": dress_code, "preferences": preferences}
+    
+    def iter_items():
+        if manifest is not None:
+            for row in csv.DictReader(manifest):
+                item = dict(defaults, id=row.get('id') or row['path'], image=row['path'])
+                item.update({key: row[key] for key in ('gender', 'dress_code', 'preferences') if row.get(key)})
+                yield item
+        for path in paths:
+            if os.path.isdir(path):
+                filenames = sorted(
+                    os.path.join(path, name) for name in os.listdir(path) if allowed_file(name)
+                )
+            else:
+                filenames = [path]
+            for filename in filenames:
+                yield dict(defaults, id=filename, image=filename)
+    
+    failed = total = 0
+    for record in run_batch(recommender, iter_items(), max_workers=workers):
+        total += 1
+        failed += record['status'] == 'error'
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+    
+    click.echo(f"Analyzed {total} images ({failed} failed)", err=True)
+    if failed:
+        sys.exit(1)
+
 if __name__ == '__main__':
     # Check if required environment variables are set
     if not app.config['GROQ_API_KEY']:
@@ -0,0 +1,146 @@
+"""
+ASGI entry point: uvicorn asgi:app --workers 2
+
+Image analyses submitted to POST /api/v1/analyses run on the event loop:
+Groq calls go through the asyncio client and the CPU-bound image work runs
+on the recommender's thread pool, so one process can hold hundreds of
+analyses in flight while they wait on the upstream. Every other route is
+the Flask app, served from a thread pool.
+"""
+import asyncio
+import contextlib
+import functools
+import io
+import math
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.routing import Mount, Route
+
+import app as flask_app
+from config import Config
+from utils import metrics
+from utils.admission import AdmissionRejected
+
+
+def budget_from(form):
+    """Per-request latency budget in seconds, or None (see app.latency_budget)"""
+    try:
+        budget = float(form.get('latency_budget', ''))
+    except ValueError:
+        return None
+    return budget if math.isfinite(budget) and budget > 0 else None
+
+
+async def create_analysis(request):
+    """
+    Analyze an uploaded photo: multipart image, gender, dress_code and optional
+    preferences/latency_budget. Answers 201 with the result and its Location,
+    or 303 to an already stored result for the same photo and inputs.
+    """
+    start = time.perf_counter()
+    response = await _create_analysis(request)
+    metrics.REQUEST_DURATION.observe(
+        time.perf_counter() - start,
+        route='/api/v1/analyses', method='POST', status=response.status_code
+    )
+    return response
+
+
+class BodyTooLarge(Exception):
+    """Raised while reading a request body longer than MAX_CONTENT_LENGTH"""
+    pass
+
+
+def limit_body(receive, max_bytes):
+    """ASGI receive callable that raises BodyTooLarge once more than max_bytes of body arrived"""
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        message = await receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > max_bytes:
+                raise BodyTooLarge()
+        return message
+
+    return limited_receive
+
+
+async def _create_analysis(request):
+    if int(request.headers.get('content-length') or 0) > Config.MAX_CONTENT_LENGTH:
+        return JSONResponse({"error": "Image is too large"}, status_code=413)
+
+    recommender = flask_app.get_recommender()
+    if recommender is None:
+        return JSONResponse({"error": "AI recommendations are not configured"}, status_code=503)
+
+    # Chunked uploads carry no Content-Length, so the limit is enforced while reading too
+    limited = Request(request.scope, limit_body(request.receive, Config.MAX_CONTENT_LENGTH))
+    try:
+        async with limited.form() as form:
+            return await _analyze_form(form, recommender)
+    except BodyTooLarge:
+        return JSONResponse({"error": "Image is too large"}, status_code=413)
+
+
+async def _analyze_form(form, recommender):
+    upload = form.get('image')
+    if upload is None or not getattr(upload, 'filename', ''):
+        return JSONResponse({"error": "No image selected"}, status_code=400)
+    if not flask_app.allowed_file(upload.filename):
+        return JSONResponse({"error": "Invalid file type. Please upload PNG, JPG, JPEG, or GIF files."},
+                            status_code=400)
+
+    gender = form.get('gender')
+    dress_code = form.get('dress_code')
+    preferences = form.get('preferences', '')
+    is_valid, message = recommender.validate_inputs(gender, dress_code)
+    if not is_valid:
+        return JSONResponse({"error": message}, status_code=400)
+
+    image_data = await upload.read()
+    loop = asyncio.get_running_loop()
+    filename = await loop.run_in_executor(
+        recommender.cpu_executor, flask_app.upload_store.save, image_data, flask_app.file_extension(upload.filename)
+    )
+    result_id = flask_app.result_id_for(filename, gender, dress_code, preferences)
+    if await loop.run_in_executor(recommender.cpu_executor, flask_app.result_store.__contains__, result_id):
+        return RedirectResponse(f"/api/v1/analyses/{result_id}", status_code=303)
+
+    try:
+        result = await recommender.process_user_request_async(
+            io.BytesIO(image_data), gender, dress_code, preferences, latency_budget=budget_from(form)
+        )
+    except AdmissionRejected as e:
+        retry_after = max(1, int(math.ceil(e.retry_after)))
+        return JSONResponse({"error": str(e), "retry_after": retry_after}, status_code=503,
+                            headers={"Retry-After": str(retry_after)})
+
+    result['image_path'] = f"uploads/{filename}"
+    result_id = await loop.run_in_executor(
+        recommender.cpu_executor, functools.partial(flask_app.save_result, result, result_id=result_id)
+    )
+    return JSONResponse(result, status_code=201, headers={"Location": f"/api/v1/analyses/{result_id}"})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_app):
+    # Build the recommender before the first request (it imports PIL, NumPy and the clients)
+    recommender = await asyncio.get_running_loop().run_in_executor(None, flask_app.get_recommender)
+    yield
+    if recommender is not None:
+        await recommender.close_async()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/v1/analyses', create_analysis, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app.app, workers=Config.ASGI_WSGI_THREADS))
+    ],
+    lifespan=lifespan
+)
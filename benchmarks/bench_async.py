@@ -0,0 +1,113 @@
+"""
+Sync vs. async serving benchmark
+
+Runs image analyses against the stub Groq server through one process of
+each serving mode and reports latency percentiles, throughput, errors,
+resident memory and thread count at each concurrency level:
+
+    sync   gunicorn -c gunicorn.conf.py app:app  (1 worker, GUNICORN_THREADS threads), POST /analyze
+    async  uvicorn asgi:app                      (1 process),                         POST /api/v1/analyses
+
+Caches, near-duplicate reuse, stored results and admission control are
+disabled so every request runs the whole pipeline. The stub answers after
+--stub-latency seconds, so the run measures how many analyses a process
+can hold in flight while waiting on the upstream.
+
+Usage: python benchmarks/bench_async.py --concurrency 16,100,300 --stub-latency 1.0
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import free_port, process_rss, run_level, sample_images, wait_for
+
+
+def thread_count(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def start_server(mode, port, env):
+    if mode == 'sync':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+        env = dict(env, BIND=f'127.0.0.1:{port}', WEB_CONCURRENCY='1')
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+                   '--log-level', 'warning', '--no-access-log']
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', default='sync,async', help='comma-separated: sync, async')
+    parser.add_argument('--concurrency', default='16,100,300', help='comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=0, help='requests per level (default: 2x concurrency)')
+    parser.add_argument('--threads', type=int, default=8, help='gunicorn threads for the sync worker')
+    parser.add_argument('--stub-latency', type=float, default=1.0)
+    parser.add_argument('--stub-token-rate', type=float, default=2000.0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    images = sample_images()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        stub_port = free_port()
+        stub = subprocess.Popen([
+            sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_groq_server.py'),
+            '--port', str(stub_port), '--latency', str(args.stub_latency),
+            '--token-rate', str(args.stub_token_rate)
+        ])
+        try:
+            wait_for('127.0.0.1', stub_port, '/health')
+            env = dict(
+                os.environ,
+                GROQ_API_KEY='stub', GROQ_BASE_URL=f'http://127.0.0.1:{stub_port}',
+                GROQ_POOL_SIZE='500', ASYNC_GROQ_POOL_SIZE='500', GUNICORN_THREADS=str(args.threads),
+                DEDUP_ENABLED='0', TIPS_CACHE_SIZE='0', RESULT_TTL='0',
+                GROQ_VISION_RATE='0', GROQ_TEXT_RATE='0',
+                RESULT_DB_PATH=os.path.join(directory, 'results.sqlite3'),
+                CACHE_DB_PATH=os.path.join(directory, 'cache.sqlite3')
+            )
+
+            for mode in args.modes.split(','):
+                port = free_port()
+                server = start_server(mode, port, env)
+                try:
+                    wait_for('127.0.0.1', port, '/api/health')
+                    scenario = 'analyze' if mode == 'sync' else 'analyze_api'
+                    for concurrency in (int(c) for c in args.concurrency.split(',')):
+                        total = args.requests or 2 * concurrency
+                        result = run_level(f'http://127.0.0.1:{port}', scenario, images, concurrency, total)
+                        rss = process_rss(server.pid)
+                        result.update(mode=mode, rss_mb=round(sum(rss.values()), 1),
+                                      threads=sum(thread_count(int(p)) or 0 for p in rss))
+                        results.append(result)
+                        if not args.json:
+                            print(f"{mode:<6} c={concurrency:<4} p50 {result['p50_ms']:8.1f} ms  "
+                                  f"p95 {result['p95_ms']:8.1f} ms  {result['rps']:7.1f} req/s  "
+                                  f"errors {result['errors']:<4} rss {result['rss_mb']:6.1f} MB  "
+                                  f"threads {result['threads']}")
+                finally:
+                    server.terminate()
+                    server.wait()
+        finally:
+            stub.terminate()
+            stub.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
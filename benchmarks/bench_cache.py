@@ -0,0 +1,65 @@
+"""
+Cache backend benchmark
+
+Times get/set on the in-process ResponseCache and the shared SQLiteCache,
+then checks that entries written by one process are hits in others (what
+gunicorn workers see with CACHE_BACKEND=sqlite).
+
+Usage: python benchmarks/bench_cache.py --entries 256 --ops 20000 --processes 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.cache import ResponseCache, SQLiteCache
+
+VALUE = {"tips": "Wear jewel tones and crisp whites. " * 20}
+
+
+def time_ops(cache, entries, ops):
+    start = time.perf_counter()
+    for i in range(ops):
+        cache.set(f"key-{i % entries}", VALUE)
+    set_us = (time.perf_counter() - start) / ops * 1e6
+
+    start = time.perf_counter()
+    for i in range(ops):
+        cache.get(f"key-{i % entries}")
+    get_us = (time.perf_counter() - start) / ops * 1e6
+    return set_us, get_us
+
+
+def worker_hits(args):
+    path, entries = args
+    cache = SQLiteCache(path, "bench", max_entries=entries)
+    return sum(cache.get(f"key-{i}") is not None for i in range(entries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=256)
+    parser.add_argument('--ops', type=int, default=20000)
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cache.sqlite3')
+        for name, cache in (("memory", ResponseCache(max_entries=args.entries)),
+                            ("sqlite", SQLiteCache(path, "bench", max_entries=args.entries))):
+            set_us, get_us = time_ops(cache, args.entries, args.ops)
+            print(f"{name:<8} set {set_us:8.1f} us  get {get_us:8.1f} us  entries {len(cache)}")
+
+        # Evicted down to the bound, then visible from fresh processes
+        with Pool(args.processes) as pool:
+            hits = pool.map(worker_hits, [(path, args.entries)] * args.processes)
+        print(f"cross-process hits {hits} of {args.entries} per process")
+
+
+if __name__ == '__main__':
+    main()
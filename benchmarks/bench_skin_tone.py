@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for ImageProcessor.analyze_skin_tone
+
+Generates large synthetic uploads in memory (photo-like JPEGs up to the
+16MB upload limit and a PNG) and reports per-call latency. The last row
+times analysis of an already-decoded image, i.e. the cost of the
+vectorized pipeline without entropy decoding; --detect adds the face /
+upper-body search on a normalized image and the pixels it saves.
+
+Usage: python benchmarks/bench_skin_tone.py [--iterations 50]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.image_processor import ImageProcessor
+
+
+def make_image(width, height, grain=8, seed=0):
+    """Build a portrait-like image: gradient background, skin ellipse, sensor grain"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    pixels = np.empty((height, width, 3), dtype=np.float32)
+    pixels[..., 0] = gradient
+    pixels[..., 1] = gradient[::-1]
+    pixels[..., 2] = 120
+    pixels += rng.normal(0, grain, size=pixels.shape)
+    pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    # Skin-coloured ellipse in the upper centre
+    yy, xx = np.ogrid[:height, :width]
+    face = ((xx - width / 2) / (width / 5)) ** 2 + ((yy - height / 3) / (height / 4)) ** 2 <= 1
+    skin = np.array([198, 148, 118], dtype=np.int16)
+    noise = rng.integers(-12, 13, size=(int(face.sum()), 3))
+    pixels[face] = np.clip(skin + noise, 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+
+def make_upload(fmt, width, height, grain=8):
+    buffer = io.BytesIO()
+    make_image(width, height, grain).save(buffer, format=fmt, quality=95)
+    return buffer.getvalue()
+
+
+def run(label, data, processor, iterations):
+    timings = []
+    result = None
+    for _ in range(iterations):
+        source = data.copy() if isinstance(data, Image.Image) else io.BytesIO(data)
+        start = time.perf_counter()
+        result = processor.analyze_skin_tone(source)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    size = len(data) / 1e6 if isinstance(data, bytes) else 0.0
+    print(f"{label:<28} {size:6.1f} MB  "
+          f"mean {statistics.mean(timings):7.2f} ms  "
+          f"p50 {statistics.median(timings):7.2f} ms  "
+          f"p95 {p95:7.2f} ms  -> {result[0]} ({result[1]})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--size', type=int, default=128, help='analysis working size')
+    parser.add_argument('--detect', action='store_true', help='also time face / upper-body detection')
+    args = parser.parse_args()
+
+    processor = ImageProcessor(args.size)
+    uploads = [
+        ("JPEG 6000x4000", make_upload("JPEG", 6000, 4000)),
+        ("JPEG 4000x3000 (grainy)", make_upload("JPEG", 4000, 3000, grain=40)),
+        ("JPEG 1280x960", make_upload("JPEG", 1280, 960)),
+        ("PNG 1600x1200", make_upload("PNG", 1600, 1200)),
+        ("decoded 1280x960", make_image(1280, 960)),
+    ]
+    for label, data in uploads:
+        run(label, data, processor, args.iterations)
+
+    if args.detect:
+        image = processor.normalize_image(io.BytesIO(uploads[0][1]))
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            _, vision_region, face_box = processor.regions_of_interest(image)
+            timings.append((time.perf_counter() - start) * 1000)
+        kept = vision_region.width * vision_region.height / float(image.width * image.height)
+        print(f"{'detect_face ' + 'x'.join(map(str, image.size)):<28} {'':>9}  "
+              f"mean {statistics.mean(timings):7.2f} ms  "
+              f"p50 {statistics.median(timings):7.2f} ms  -> face {face_box}, {kept:.0%} of pixels sent")
+
+
+if __name__ == '__main__':
+    main()
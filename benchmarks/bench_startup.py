@@ -0,0 +1,61 @@
+"""
+Cold-start benchmark
+
+Measures, in fresh interpreter processes: the time to `import app`, the
+time until the first /api/health response, and the time to build the
+recommender (Groq/httpx clients, PIL, NumPy) on first use.
+
+Usage: python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+client.get('/api/health')
+health = time.perf_counter()
+app.get_recommender()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_health_ms": (health - start) * 1000,
+    "recommender_ms": (ready - health) * 1000
+}))
+"""
+
+
+def run_once():
+    env = dict(os.environ, GROQ_API_KEY=os.environ.get('GROQ_API_KEY', 'bench'))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    # Discard one run so .pyc compilation is not counted
+    run_once()
+    samples = [run_once() for _ in range(args.runs)]
+    for key in ("import_ms", "first_health_ms", "recommender_ms"):
+        values = [s[key] for s in samples]
+        print(f"{key:<16} median {statistics.median(values):8.1f} ms  "
+              f"min {min(values):8.1f} ms  max {max(values):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Load-testing harness for /analyze and /quick-recommend
+
+Starts the local stub Groq server and the Flask app (or targets an
+already running server with --target), drives each scenario at fixed
+concurrency levels and reports p50/p95/p99 latency, requests per second,
+errors and resident memory per worker process.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 1,8,32 --requests 200
+    python benchmarks/load_test.py --target http://127.0.0.1:8000 --pid <gunicorn master pid>
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_skin_tone import make_image
+from config import Config
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(host, port, path, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", path)
+            if conn.getresponse().status < 500:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def sample_images(directory=None, count=8):
+    """JPEG payloads from a directory, or synthetic portraits of varied size"""
+    if directory:
+        names = sorted(n for n in os.listdir(directory) if n.lower().endswith(('.jpg', '.jpeg', '.png')))
+        return [(name, open(os.path.join(directory, name), 'rb').read()) for name in names]
+
+    images = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        width = 800 + 400 * (i % 4)
+        make_image(width, width * 3 // 4, seed=i).save(buffer, format="JPEG", quality=90)
+        images.append((f"sample-{i}.jpg", buffer.getvalue()))
+    return images
+
+
+def multipart(fields, file_field, filename, data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+        f'Content-Type: image/jpeg\r\n\r\n'.encode() + data + b'\r\n'
+    )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def build_requests(scenario, images):
+    """Yield (method, path, body, content_type) for the scenario, cycling inputs"""
+    i = 0
+    while True:
+        gender = Config.GENDERS[i % len(Config.GENDERS)]
+        dress_code = Config.DRESS_CODES[i % len(Config.DRESS_CODES)]
+        if scenario in ('analyze', 'analyze_api'):
+            filename, data = images[i % len(images)]
+            body, content_type = multipart({'gender': gender, 'dress_code': dress_code}, 'image', filename, data)
+            # analyze_api: the JSON endpoint served on the event loop by asgi.py
+            yield 'POST', '/analyze' if scenario == 'analyze' else '/api/v1/analyses', body, content_type
+        else:
+            skin_tone = Config.SKIN_TONES[i % len(Config.SKIN_TONES)]
+            body = f'skin_tone={skin_tone}&gender={gender}&dress_code={dress_code}'.encode()
+            yield 'POST', '/quick-recommend', body, 'application/x-www-form-urlencoded'
+        i += 1
+
+
+def succeeded(status, location):
+    """
+    Whether a response is a finished analysis: 201 (or 202 for a job), or a
+    303 to the stored result. Failures on the pages flash a message and
+    redirect to / instead, so other 3xx count as errors.
+    """
+    if status in (201, 202):
+        return True
+    return status == 303 and urlsplit(location).path.startswith(('/results/', '/api/v1/analyses/'))
+
+
+class Worker(threading.local):
+    """Per-thread keep-alive connection"""
+    conn = None
+
+
+def run_level(target, scenario, images, concurrency, total):
+    parsed = urlsplit(target)
+    local = Worker()
+    requests = build_requests(scenario, images)
+    lock = threading.Lock()
+    latencies, errors = [], []
+
+    def one(_):
+        with lock:
+            method, path, body, content_type = next(requests)
+        if local.conn is None:
+            local.conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=120)
+        start = time.perf_counter()
+        try:
+            local.conn.request(method, path, body=body, headers={'Content-Type': content_type})
+            response = local.conn.getresponse()
+            response.read()
+            status, location = response.status, response.getheader('Location', '')
+        except (OSError, http.client.HTTPException) as e:
+            local.conn.close()
+            local.conn = None
+            status, location = type(e).__name__, ''
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not succeeded(status, location):
+                errors.append(status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(total)))
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": total,
+        "p50_ms": round(pct(0.50), 1),
+        "p95_ms": round(pct(0.95), 1),
+        "p99_ms": round(pct(0.99), 1),
+        "rps": round(total / wall, 1),
+        "errors": len(errors)
+    }
+
+
+def process_rss(pid):
+    """Resident memory (MB) of pid and of each child process (e.g. gunicorn workers)"""
+    def rss(p):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            return None
+
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    children.append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    workers = {p: rss(p) for p in children} or {pid: rss(pid)}
+    return {str(p): round(m, 1) for p, m in workers.items() if m is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', default='analyze,quick',
+                        help='comma-separated: analyze, quick, analyze_api (ASGI only)')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma-separated concurrency levels')
+    parser.add_argument('--requests', type=int, default=100, help='requests per level')
+    parser.add_argument('--images', help='directory of sample images (default: synthetic)')
+    parser.add_argument('--target', help='base URL of a running app (default: start one)')
+    parser.add_argument('--pid', type=int, help='app (master) process id for memory reporting with --target')
+    parser.add_argument('--warm-caches', action='store_true',
+                        help='keep tips/dedup caches and stored results enabled (default measures the uncached pipeline)')
+    parser.add_argument('--stub-latency', type=float, default=0.3)
+    parser.add_argument('--stub-token-rate', type=float, default=500.0)
+    parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    processes = []
+    target, pid = args.target, args.pid
+    try:
+        if target is None:
+            stub_port, app_port = free_port(), free_port()
+            processes.append(subprocess.Popen([
+                sys.executable, os.path.join(ROOT, 'benchmarks', 'stub_groq_server.py'),
+                '--port', str(stub_port), '--latency', str(args.stub_latency),
+                '--token-rate', str(args.stub_token_rate), '--error-rate', str(args.stub_error_rate)
+            ]))
+            wait_for('127.0.0.1', stub_port, '/health')
+
+            # Admission control would shed everything above its burst, measuring the
+            # token buckets rather than the app (as in bench_async.py)
+            env = dict(os.environ, GROQ_API_KEY='stub', GROQ_BASE_URL=f'http://127.0.0.1:{stub_port}',
+                       GROQ_VISION_RATE='0', GROQ_TEXT_RATE='0')
+            if not args.warm_caches:
+                env.update(DEDUP_ENABLED='0', TIPS_CACHE_SIZE='0', RESULT_TTL='0')
+            app_process = subprocess.Popen(
+                [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(app_port), '--with-threads'],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            processes.append(app_process)
+            target, pid = f'http://127.0.0.1:{app_port}', app_process.pid
+            parsed = urlsplit(target)
+            wait_for(parsed.hostname, parsed.port, '/api/health')
+
+        images = sample_images(args.images)
+        results = []
+        for scenario in args.scenarios.split(','):
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                result = run_level(target, scenario, images, concurrency, args.requests)
+                if pid:
+                    result["rss_mb"] = process_rss(pid)
+                results.append(result)
+                if not args.json:
+                    print(f"{scenario:<8} c={concurrency:<4} p50 {result['p50_ms']:8.1f} ms  "
+                          f"p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+                          f"{result['rps']:7.1f} req/s  errors {result['errors']:<4} "
+                          f"rss {result.get('rss_mb', 'n/a')}")
+
+        if args.json:
+            print(json.dumps(results, indent=2))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
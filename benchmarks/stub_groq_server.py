@@ -0,0 +1,266 @@
+"""
+Local OpenAI/Groq-compatible stand-in for load testing
+
+Serves POST /openai/v1/chat/completions (blocking and stream=true) with
+configurable latency, token rate and error injection, so the app can be
+benchmarked without spending Groq quota. Point the app at it with
+GROQ_BASE_URL=http://127.0.0.1:<port> and any GROQ_API_KEY.
+
+Usage: python benchmarks/stub_groq_server.py --port 8787 --latency 0.4 --token-rate 400
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RECOMMENDATIONS = {
+    "skin_tone_analysis": {
+        "detected_tone": "Medium",
+        "undertone": "warm",
+        "color_harmony_explanation": "Warm undertones are flattered by rich jewel tones and earthy neutrals."
+    },
+    "outfit_recommendations": {
+        "tops": ["Emerald silk blouse", "Mustard kurta with mirror work", "Crisp white linen shirt"],
+        "bottoms": ["High-waisted navy trousers", "Ivory palazzo pants", "Dark indigo jeans"],
+        "shoes": ["Tan block heels", "Embroidered juttis", "White leather sneakers"],
+        "dresses": ["Rust wrap dress", "Teal anarkali"],
+        "outerwear": ["Camel trench coat", "Olive utility jacket"]
+    },
+    "color_palette": {
+        "best_colors": ["Emerald", "Mustard", "Rust", "Teal", "Ivory", "Burgundy"],
+        "metal_tones": ["Gold", "Rose gold"],
+        "colors_to_avoid": ["Pastel lilac", "Icy grey"]
+    },
+    "accessories": {
+        "jewelry": ["Gold jhumkas", "Layered chain necklace"],
+        "bags": ["Tan structured tote"],
+        "watches": ["Gold-tone analog watch"],
+        "other": ["Silk dupatta in teal"]
+    },
+    "hairstyle_suggestions": {
+        "recommended_styles": ["Soft waves", "Low bun with face-framing strands"],
+        "maintenance_tips": ["Weekly oil massage"],
+        "color_recommendations": ["Chocolate brown", "Caramel highlights"]
+    },
+    "makeup_tips": {
+        "foundation": ["Warm beige with golden undertone"],
+        "lipstick": ["Brick red", "Terracotta nude"],
+        "eyeshadow": ["Bronze", "Olive green"]
+    },
+    "shopping_links": {
+        "amazon_in": ["emerald silk blouse women"],
+        "myntra": ["mustard kurta mirror work"],
+        "ajio": ["rust wrap dress"]
+    },
+    "styling_tips": ["Anchor bold colors with ivory neutrals", "Match metals to your undertone"],
+    "confidence_boosters": ["Jewel tones bring out the warmth in your complexion"]
+}
+
+TIPS = ("For a warm complexion, lean on jewel tones such as emerald, sapphire and ruby, balanced with "
+        "ivory and camel neutrals. Gold accessories will echo your undertone. Choose structured pieces "
+        "for formal settings and breathable fabrics like linen and cotton for daytime events. ")
+
+
+class StubConfig:
+    latency = 0.3
+    jitter = 0.1
+    token_rate = 500.0
+    max_tokens = None
+    error_rate = 0.0
+    rate_limit_rate = 0.0
+    retry_after = 1.0
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    @classmethod
+    def roll(cls):
+        with cls.lock:
+            return cls.rng.random(), cls.rng.uniform(-cls.jitter, cls.jitter)
+
+
+def tokenize(text):
+    """Split text into word-ish pieces that stream like tokens"""
+    pieces, current = [], ""
+    for char in text:
+        current += char
+        if char in " ,\n":
+            pieces.append(current)
+            current = ""
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        roll, jitter = StubConfig.roll()
+        if roll < StubConfig.rate_limit_rate:
+            self._send_json(429, {"error": {"message": "rate limited", "type": "tokens"}},
+                            {"Retry-After": str(StubConfig.retry_after)})
+            return
+        if roll < StubConfig.rate_limit_rate + StubConfig.error_rate:
+            time.sleep(max(0.0, StubConfig.latency + jitter))
+            self._send_json(503, {"error": {"message": "injected upstream error"}})
+            return
+
+        model = body.get("model", "stub-model")
+        content = json.dumps(self._sections(body), indent=2) if self._wants_json(body) else TIPS * 3
+        tokens = tokenize(content)
+        limit = StubConfig.max_tokens or body.get("max_tokens")
+        if limit:
+            tokens = tokens[:limit]
+
+        # Time to first token
+        time.sleep(max(0.0, StubConfig.latency + jitter))
+
+        if body.get("stream"):
+            self._stream(model, tokens)
+        else:
+            time.sleep(len(tokens) / StubConfig.token_rate)
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "".join(tokens)}
+                }],
+                "usage": self._usage(body, tokens)
+            })
+
+    @staticmethod
+    def _wants_json(body):
+        """Vision requests ask for the JSON recommendation structure"""
+        for message in body.get("messages", []):
+            if isinstance(message.get("content"), list):
+                return True
+            if "JSON" in str(message.get("content", "")):
+                return True
+        return False
+
+    @staticmethod
+    def _sections(body):
+        """The recommendation sections whose keys the prompt's schema asks for (all if none)"""
+        prompt = json.dumps(body.get("messages", []))
+        # The requested structure follows any analysis given as context
+        prompt = prompt[max(0, prompt.rfind("following structure")):]
+        requested = {k: v for k, v in RECOMMENDATIONS.items() if f'\\"{k}\\"' in prompt}
+        return requested or RECOMMENDATIONS
+    
+    @staticmethod
+    def _usage(body, tokens):
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens)
+        }
+
+    def _stream(self, model, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        delay = 1.0 / StubConfig.token_rate
+        for i, token in enumerate(tokens):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+            }
+            if i == len(tokens) - 1:
+                chunk["choices"][0]["finish_reason"] = "stop"
+                chunk["x_groq"] = {"id": completion_id, "usage": self._usage({}, tokens)}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(delay)
+
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(host="127.0.0.1", port=8787):
+    """Start the stub server on a background thread and return it"""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-groq", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0.3, help='seconds to first token')
+    parser.add_argument('--jitter', type=float, default=0.1, help='+/- seconds added to latency')
+    parser.add_argument('--token-rate', type=float, default=500.0, help='generated tokens per second')
+    parser.add_argument('--max-tokens', type=int, help='cap completion length')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of 503 responses')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of 429 responses')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds on 429')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    StubConfig.latency = args.latency
+    StubConfig.jitter = args.jitter
+    StubConfig.token_rate = args.token_rate
+    StubConfig.max_tokens = args.max_tokens
+    StubConfig.error_rate = args.error_rate
+    StubConfig.rate_limit_rate = args.rate_limit_rate
+    StubConfig.retry_after = args.retry_after
+    StubConfig.rng = random.Random(args.seed)
+
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    server.daemon_threads = True
+    print(f"Stub Groq API listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
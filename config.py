@@ -6,10 +6,106 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-here'
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+    # Point at a local stand-in server for testing (defaults to api.groq.com)
+    GROQ_BASE_URL = os.environ.get('GROQ_BASE_URL')
+    
+    # Upstream transport: deadlines (seconds), retries, connection pool, circuit breaker
+    GROQ_CONNECT_TIMEOUT = float(os.environ.get('GROQ_CONNECT_TIMEOUT', 5))
+    GROQ_READ_TIMEOUT = float(os.environ.get('GROQ_READ_TIMEOUT', 60))
+    GROQ_MAX_RETRIES = int(os.environ.get('GROQ_MAX_RETRIES', 2))
+    GROQ_POOL_SIZE = int(os.environ.get('GROQ_POOL_SIZE', 20))
+    GROQ_BREAKER_THRESHOLD = int(os.environ.get('GROQ_BREAKER_THRESHOLD', 5))
+    GROQ_BREAKER_RESET = float(os.environ.get('GROQ_BREAKER_RESET', 30))
+    
+    # Admission control: upstream calls per second and burst size per model (0 disables
+    # a budget); callers queue up to ADMISSION_MAX_WAIT seconds, after that they get a 503
+    GROQ_VISION_RATE = float(os.environ.get('GROQ_VISION_RATE', 1.0))
+    GROQ_VISION_BURST = int(os.environ.get('GROQ_VISION_BURST', 10))
+    GROQ_TEXT_RATE = float(os.environ.get('GROQ_TEXT_RATE', 2.0))
+    GROQ_TEXT_BURST = int(os.environ.get('GROQ_TEXT_BURST', 20))
+    ADMISSION_MAX_WAIT = float(os.environ.get('ADMISSION_MAX_WAIT', 5))
+    
+    # Model routing for image analyses: routes in preference order (vision = 90b
+    # vision model, vision_small = 11b vision model, text = text model plus local
+    # skin/garment analysis), the default latency budget in seconds and the
+    # recent error rate above which a route is skipped
+    ROUTING_ROUTES = [name.strip() for name in os.environ.get('ROUTING_ROUTES', 'vision,vision_small,text').split(',')
+                      if name.strip()]
+    ROUTING_LATENCY_BUDGET = float(os.environ.get('ROUTING_LATENCY_BUDGET', 12))
+    ROUTING_MAX_ERROR_RATE = float(os.environ.get('ROUTING_MAX_ERROR_RATE', 0.5))
+    ROUTING_PROBE_INTERVAL = float(os.environ.get('ROUTING_PROBE_INTERVAL', 30))
+    
+    # ASGI serving mode (uvicorn asgi:app): threads for image work off the event
+    # loop, and upstream connections shared by all in-flight analyses
+    ASYNC_CPU_WORKERS = int(os.environ.get('ASYNC_CPU_WORKERS', os.cpu_count() or 4))
+    ASYNC_GROQ_POOL_SIZE = int(os.environ.get('ASYNC_GROQ_POOL_SIZE', 200))
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+    
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     
+    # Retention for displayed uploads (content-addressed, swept in the background)
+    UPLOAD_MAX_AGE = int(os.environ.get('UPLOAD_MAX_AGE', 7 * 24 * 3600))
+    UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 1024 * 1024 * 1024))
+    UPLOAD_SWEEP_INTERVAL = int(os.environ.get('UPLOAD_SWEEP_INTERVAL', 600))
+    
+    # Resized upload derivatives (/media/<digest>/<variant>), immutable once rendered
+    MEDIA_QUALITY = int(os.environ.get('MEDIA_QUALITY', 80))
+    MEDIA_MAX_AGE = int(os.environ.get('MEDIA_MAX_AGE', 365 * 24 * 3600))
+    
+    # Longest edge (pixels) of the working copy used for skin tone analysis
+    SKIN_ANALYSIS_SIZE = int(os.environ.get('SKIN_ANALYSIS_SIZE', 128))
+    
+    # Normalized image sent to the vision model (JPEG or WEBP)
+    IMAGE_MAX_EDGE = int(os.environ.get('IMAGE_MAX_EDGE', 1024))
+    IMAGE_FORMAT = os.environ.get('IMAGE_FORMAT', 'JPEG')
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 85))
+    
+    # Tips and near-duplicate caches: "sqlite" shares one file between all worker
+    # processes on the node (and survives restarts); "memory" is per process
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+    CACHE_DB_PATH = os.environ.get('CACHE_DB_PATH', 'instance/cache.sqlite3')
+    
+    # Quick-recommend tips cache (with the memory backend, set TIPS_CACHE_PATH to
+    # persist it across restarts)
+    TIPS_CACHE_SIZE = int(os.environ.get('TIPS_CACHE_SIZE', 256))
+    TIPS_CACHE_TTL = int(os.environ.get('TIPS_CACHE_TTL', 7 * 24 * 3600))
+    TIPS_CACHE_PATH = os.environ.get('TIPS_CACHE_PATH')
+    
+    # Near-duplicate upload detection (perceptual hash, Hamming distance in bits)
+    DEDUP_ENABLED = os.environ.get('DEDUP_ENABLED', '1') == '1'
+    DEDUP_MAX_ENTRIES = int(os.environ.get('DEDUP_MAX_ENTRIES', 1024))
+    DEDUP_THRESHOLD = int(os.environ.get('DEDUP_THRESHOLD', 6))
+    DEDUP_TTL = int(os.environ.get('DEDUP_TTL', 7 * 24 * 3600))
+    
+    # Job mode for /analyze (per request with async=1, or default via ANALYZE_ASYNC)
+    ANALYZE_ASYNC = os.environ.get('ANALYZE_ASYNC', '0') == '1'
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+    JOB_QUEUE_SIZE = int(os.environ.get('JOB_QUEUE_SIZE', 32))
+    JOB_TTL = int(os.environ.get('JOB_TTL', 3600))
+    
+    # Seconds a streaming upload's signed event stream URL stays valid
+    STREAM_PENDING_TTL = int(os.environ.get('STREAM_PENDING_TTL', 300))
+    
+    # Batch analysis (/api/batch-analyze and `flask batch-analyze`)
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 50))
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 4))
+    
+    # Versioned JSON API (/api/v1). Bump PROMPT_VERSION whenever prompts change so
+    # ETags change and clients/CDNs stop reusing answers from the old prompts.
+    PROMPT_VERSION = os.environ.get('PROMPT_VERSION', '1')
+    API_CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', 24 * 3600))
+    
+    # Persistent result store behind /results/<id> and the result APIs (SQLite).
+    # Results are kept as long as the uploads their pages show.
+    RESULT_DB_PATH = os.environ.get('RESULT_DB_PATH', 'instance/results.sqlite3')
+    RESULT_TTL = int(os.environ.get('RESULT_TTL', UPLOAD_MAX_AGE))
+    RESULT_PRUNE_INTERVAL = int(os.environ.get('RESULT_PRUNE_INTERVAL', 3600))
+    
+    # Secondary recommendation sections, generated on request per analysis
+    SECTION_WORKERS = int(os.environ.get('SECTION_WORKERS', 4))
+    
     # Skin tone categories
     SKIN_TONES = ['Fair', 'Medium', 'Olive', 'Deep']
     
@@ -0,0 +1,18 @@
+"""
+Gunicorn settings: gunicorn -c gunicorn.conf.py app:app
+
+Workers import the app without building model clients; each one then
+warms its recommender in the background so the first request does not pay
+for the Groq/httpx and image-processing imports.
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def post_worker_init(worker):
+    from app import warm_up
+    warm_up()
@@ -72,12 +72,28 @@ function initializeFormValidation() {
                 return false;
             }
             
+            // Ask for a streamed results page when the browser can consume it
+            enableStreaming(form);
+            
             // Show loading state
             showLoadingState(form);
         });
     });
 }
 
+function enableStreaming(form) {
+    // Forms rendered in job mode (ANALYZE_ASYNC) opt out with data-stream="off"
+    if (!window.EventSource || form.dataset.stream === 'off' || form.querySelector('input[name="stream"]')) {
+        return;
+    }
+    
+    const streamInput = document.createElement('input');
+    streamInput.type = 'hidden';
+    streamInput.name = 'stream';
+    streamInput.value = '1';
+    form.appendChild(streamInput);
+}
+
 function validateForm(form) {
     let isValid = true;
     const requiredFields = form.querySelectorAll('[required]');
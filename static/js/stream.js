@@ -0,0 +1,313 @@
+// StyleAI streamed results: renders recommendation sections as they arrive
+
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('stream-results');
+    if (container && container.dataset.streamUrl) {
+        initializeResultStream(container);
+    }
+
+    // Results page: secondary sections are generated on request
+    const more = document.getElementById('more-sections');
+    if (more && !more.hidden) {
+        initializeMoreSections(more);
+    }
+});
+
+const SECTION_META = {
+    skin_tone_analysis: { title: 'Skin Tone Insights', icon: 'fa-info-circle' },
+    outfit_recommendations: { title: 'Outfit Recommendations', icon: 'fa-tshirt', grid: 'outfit-grid', item: 'outfit-category' },
+    color_palette: { title: 'Color Palette', icon: 'fa-palette', grid: 'outfit-grid', item: 'outfit-category' },
+    accessories: { title: 'Accessories', icon: 'fa-gem', grid: 'accessories-grid', item: 'accessory-category' },
+    hairstyle_suggestions: { title: 'Hairstyle Suggestions', icon: 'fa-cut', grid: 'outfit-grid', item: 'outfit-category' },
+    makeup_tips: { title: 'Makeup Tips', icon: 'fa-magic', grid: 'accessories-grid', item: 'accessory-category' },
+    shopping_links: { title: 'Shop Now', icon: 'fa-shopping-cart', grid: 'shopping-links', item: 'platform-section' },
+    styling_tips: { title: 'Styling Tips', icon: 'fa-lightbulb' },
+    confidence_boosters: { title: 'Confidence Boosters', icon: 'fa-heart' },
+    basic_tips: { title: 'Fashion Tips', icon: 'fa-comment' },
+    raw_response: { title: 'Detailed Recommendations', icon: 'fa-comment' }
+};
+
+function initializeResultStream(container) {
+    const mode = container.dataset.mode;
+    const sections = document.getElementById('ai-sections');
+    const status = document.getElementById('stream-status');
+    const rendered = new Set();
+    let tokenCount = 0;
+    let liveText = null;
+
+    const source = new EventSource(container.dataset.streamUrl);
+
+    source.addEventListener('skin_analysis', function(e) {
+        renderSkinAnalysis(JSON.parse(e.data));
+    });
+
+    source.addEventListener('color_match', function(e) {
+        renderColorMatch(JSON.parse(e.data));
+    });
+
+    source.addEventListener('token', function(e) {
+        const text = JSON.parse(e.data).text;
+        tokenCount += 1;
+
+        if (mode === 'tips') {
+            // Plain-text tips are shown as they are generated
+            if (!liveText) {
+                const card = createCard('basic_tips');
+                liveText = document.createElement('p');
+                liveText.className = 'response-text';
+                card.appendChild(liveText);
+                sections.appendChild(card);
+                rendered.add('basic_tips');
+            }
+            liveText.textContent += text;
+        } else {
+            status.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Generating recommendations&hellip; (${tokenCount} tokens)`;
+        }
+    });
+
+    source.addEventListener('section', function(e) {
+        const section = JSON.parse(e.data);
+        if (!rendered.has(section.name)) {
+            sections.appendChild(renderSection(section.name, section.value));
+            rendered.add(section.name);
+        }
+    });
+
+    source.addEventListener('error', function(e) {
+        // Server-sent error event (connection errors carry no data)
+        if (e.data) {
+            const errorCard = document.getElementById('stream-error');
+            errorCard.querySelector('.stream-error-message').textContent = JSON.parse(e.data).message;
+            errorCard.hidden = false;
+        } else if (source.readyState !== EventSource.OPEN) {
+            source.close();
+            status.textContent = 'The connection was interrupted. Please try again.';
+        }
+    });
+
+    source.addEventListener('done', function(e) {
+        source.close();
+        const result = JSON.parse(e.data);
+        const recommendations = result.ai_recommendations || {};
+
+        // Anything the incremental parser could not emit (e.g. prose answers)
+        Object.keys(recommendations).forEach(name => {
+            if (!rendered.has(name) && name !== 'error') {
+                sections.appendChild(renderSection(name, recommendations[name]));
+                rendered.add(name);
+            }
+        });
+        status.hidden = true;
+
+        // Reloading or sharing the page now shows the stored result
+        if (result.result_url && window.history.replaceState) {
+            window.history.replaceState(null, '', result.result_url);
+        }
+
+        const more = document.getElementById('more-sections');
+        if (more && result.analysis_id) {
+            more.dataset.sectionsUrl = more.dataset.sectionsUrl.replace('ANALYSIS_ID', result.analysis_id);
+            more.dataset.sections = more.dataset.sections.split(',').filter(name => !rendered.has(name)).join(',');
+            if (more.dataset.sections) {
+                more.hidden = false;
+                initializeMoreSections(more);
+            }
+        }
+    });
+}
+
+function initializeMoreSections(container) {
+    const buttons = container.querySelector('.more-sections-buttons');
+    const output = document.getElementById('more-sections-output');
+    const pending = new Map();
+
+    container.dataset.sections.split(',').filter(Boolean).forEach(name => {
+        const button = document.createElement('button');
+        button.type = 'button';
+        button.className = 'btn btn-outline';
+        button.textContent = (SECTION_META[name] || {}).title || titleCase(name);
+        button.addEventListener('click', () => load([name]));
+        buttons.appendChild(button);
+        pending.set(name, button);
+    });
+
+    const all = document.createElement('button');
+    all.type = 'button';
+    all.className = 'btn btn-secondary';
+    all.innerHTML = '<i class="fas fa-layer-group"></i> Show all';
+    all.addEventListener('click', () => load(Array.from(pending.keys())));
+    buttons.appendChild(all);
+
+    function load(names) {
+        // One request per click; the server generates the sections in parallel
+        names = names.filter(name => !pending.get(name).disabled);
+        if (!names.length) {
+            return;
+        }
+        names.forEach(name => {
+            const button = pending.get(name);
+            button.disabled = true;
+            button.dataset.label = button.textContent;
+            button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> ';
+            button.appendChild(document.createTextNode(button.dataset.label));
+        });
+
+        fetch(`${container.dataset.sectionsUrl}?names=${names.join(',')}`, { headers: { Accept: 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                const sections = data.sections || {};
+                names.forEach(name => {
+                    if (name in sections) {
+                        output.appendChild(renderSection(name, sections[name]));
+                        pending.get(name).remove();
+                        pending.delete(name);
+                    } else {
+                        reset(name);
+                    }
+                });
+                if (!pending.size) {
+                    container.hidden = true;
+                }
+            })
+            .catch(() => names.forEach(reset));
+    }
+
+    function reset(name) {
+        const button = pending.get(name);
+        button.disabled = false;
+        button.textContent = button.dataset.label;
+    }
+}
+
+function renderSkinAnalysis(analysis) {
+    document.getElementById('detected-tone').textContent = analysis.detected_tone;
+
+    if (analysis.confidence) {
+        document.getElementById('confidence').textContent = `${Math.round(analysis.confidence * 100)}%`;
+        document.getElementById('confidence-item').hidden = false;
+    }
+
+    const palette = analysis.color_palette || {};
+    const container = document.getElementById('palette-container');
+    container.innerHTML = '';
+    [['primary', 'Primary Colors'], ['secondary', 'Secondary Colors'], ['avoid', 'Colors to Avoid']].forEach(([key, title]) => {
+        if (!palette[key]) {
+            return;
+        }
+
+        const category = document.createElement('div');
+        category.className = 'color-category';
+        category.innerHTML = `<h3>${title}</h3>`;
+
+        const swatches = document.createElement('div');
+        swatches.className = key === 'avoid' ? 'color-swatches avoid-swatches' : 'color-swatches';
+        palette[key].forEach(color => {
+            const swatch = document.createElement('div');
+            swatch.className = 'color-swatch';
+            const chip = document.createElement('div');
+            chip.className = key === 'avoid' ? 'swatch-color avoid-color' : 'swatch-color';
+            if (key !== 'avoid') {
+                chip.style.backgroundColor = (analysis.color_hex || {})[color] || '';
+            }
+            const name = document.createElement('span');
+            name.className = 'swatch-name';
+            name.textContent = color;
+            swatch.appendChild(chip);
+            swatch.appendChild(name);
+            swatches.appendChild(swatch);
+        });
+
+        category.appendChild(swatches);
+        container.appendChild(category);
+    });
+}
+
+function renderColorMatch(match) {
+    const section = document.getElementById('color-match');
+    if (!section || !match) {
+        return;
+    }
+
+    section.querySelector('.color-match-score').textContent = `${match.score}/100`;
+    section.querySelector('.color-match-text').textContent = match.summary;
+    const swatches = section.querySelector('.color-swatches');
+    swatches.innerHTML = '';
+    match.colors.forEach(color => {
+        const swatch = document.createElement('div');
+        swatch.className = `color-swatch color-match-${color.verdict}`;
+        const chip = document.createElement('div');
+        chip.className = 'swatch-color';
+        chip.style.backgroundColor = color.hex;
+        const name = document.createElement('span');
+        name.className = 'swatch-name';
+        name.textContent = `${Math.round(color.share * 100)}% \u00b7 near ${color.nearest}`;
+        swatch.appendChild(chip);
+        swatch.appendChild(name);
+        swatches.appendChild(swatch);
+    });
+    section.hidden = false;
+}
+
+function createCard(name) {
+    const meta = SECTION_META[name] || { title: titleCase(name), icon: 'fa-star' };
+    const card = document.createElement('div');
+    card.className = 'recommendation-card';
+    card.innerHTML = `<h3><i class="fas ${meta.icon}"></i> </h3>`;
+    card.querySelector('h3').appendChild(document.createTextNode(meta.title));
+    return card;
+}
+
+function renderSection(name, value) {
+    const meta = SECTION_META[name] || {};
+    const card = createCard(name);
+
+    if (name === 'skin_tone_analysis' && value && typeof value === 'object') {
+        const undertone = document.createElement('p');
+        undertone.innerHTML = '<strong>Undertone:</strong> ';
+        undertone.appendChild(document.createTextNode(value.undertone || ''));
+        const explanation = document.createElement('p');
+        explanation.textContent = value.color_harmony_explanation || '';
+        card.appendChild(undertone);
+        card.appendChild(explanation);
+    } else if (Array.isArray(value)) {
+        card.appendChild(renderList(value, 'tips-list'));
+    } else if (value && typeof value === 'object') {
+        const grid = document.createElement('div');
+        grid.className = meta.grid || 'outfit-grid';
+        Object.keys(value).forEach(category => {
+            const column = document.createElement('div');
+            column.className = meta.item || 'outfit-category';
+            const heading = document.createElement('h4');
+            heading.textContent = titleCase(category);
+            column.appendChild(heading);
+            const items = Array.isArray(value[category]) ? value[category] : [value[category]];
+            column.appendChild(renderList(items));
+            grid.appendChild(column);
+        });
+        card.appendChild(grid);
+    } else {
+        const text = document.createElement('p');
+        text.className = 'response-text';
+        text.textContent = value;
+        card.appendChild(text);
+    }
+
+    return card;
+}
+
+function renderList(items, className) {
+    const list = document.createElement('ul');
+    if (className) {
+        list.className = className;
+    }
+    items.forEach(item => {
+        const li = document.createElement('li');
+        li.textContent = typeof item === 'string' ? item : JSON.stringify(item);
+        list.appendChild(li);
+    });
+    return list;
+}
+
+function titleCase(name) {
+    return name.replace(/_/g, ' ').replace(/\b\w/g, c => c.toUpperCase());
+}
@@ -0,0 +1,33 @@
+import numpy as np
+from PIL import Image
+
+from utils.image_processor import ImageProcessor
+
+
+def portrait(width=400, height=300):
+    """Blue background with a skin-coloured ellipse in the upper centre"""
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    pixels[...] = (40, 90, 200)
+    yy, xx = np.ogrid[:height, :width]
+    face = ((xx - width / 2) / (width / 5)) ** 2 + ((yy - height / 3) / (height / 4)) ** 2 <= 1
+    pixels[face] = (198, 148, 118)
+    return Image.fromarray(pixels)
+
+
+def test_skin_free_image_has_no_confidence():
+    processor = ImageProcessor()
+    image = Image.new("RGB", (400, 300), (40, 90, 200))
+
+    assert processor.skin_statistics(image)["coverage"] == 0.0
+    _, confidence, _ = processor.analyze_skin_tone(image)
+    assert confidence == 0.0
+
+
+def test_confidence_grows_with_skin_coverage():
+    processor = ImageProcessor()
+    full = Image.new("RGB", (400, 300), (198, 148, 118))
+
+    tone, confidence, _ = processor.analyze_skin_tone(portrait())
+    _, full_confidence, _ = processor.analyze_skin_tone(full)
+    assert tone == "Medium"
+    assert 0.5 < confidence <= full_confidence <= 0.95
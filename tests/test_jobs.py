@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from utils.jobs import JobManager, JobQueueFull
+from utils.result_store import ResultStore
+
+
+@pytest.fixture
+def jobs(tmp_path):
+    manager = JobManager(ResultStore(str(tmp_path / "results.sqlite3")), max_workers=1, max_pending=2)
+    yield manager
+    manager.executor.shutdown(wait=True)
+
+
+def wait_until_finished(jobs, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_records_its_result_id_and_status_counts(jobs):
+    done = wait_until_finished(jobs, jobs.submit(lambda: "result-1"))
+
+    def fail():
+        raise ValueError("bad image")
+
+    failed = wait_until_finished(jobs, jobs.submit(fail))
+
+    assert done["result_id"] == "result-1"
+    assert failed["error"] == "bad image"
+    assert jobs.stats() == {"done": 1, "failed": 1}
+
+
+def test_queue_is_bounded(jobs):
+    jobs.submit(time.sleep, 0.2)
+    jobs.submit(time.sleep, 0.2)
+    with pytest.raises(JobQueueFull):
+        jobs.submit(time.sleep, 0.2)
+
+
+def test_finished_jobs_expire(jobs):
+    job_id = jobs.submit(lambda: "result-1")
+    wait_until_finished(jobs, job_id)
+    jobs.ttl = 0
+    time.sleep(0.01)
+    assert jobs.get(job_id) is None
@@ -0,0 +1,238 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from groq import APIResponseValidationError, APIStatusError, APITimeoutError
+
+from utils.transport import AsyncGroqTransport, CircuitBreaker, CircuitOpenError, GroqTransport
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions: raises or returns the queued outcomes in order"""
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def fake_client(*outcomes):
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(*outcomes)))
+
+
+def status_error(status):
+    request = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+    return APIStatusError("upstream error", response=httpx.Response(status, request=request), body=None)
+
+
+def trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+    trip(breaker)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    trip(breaker)
+    assert breaker.state == "half-open"
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    trip(breaker)
+    breaker.reset_timeout = 0
+    assert breaker.allow()
+
+    breaker.reset_timeout = 60
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_released_probe_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    trip(breaker)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("bad payload"),
+    APIResponseValidationError(httpx.Response(200, request=httpx.Request("POST", "https://api.groq.test")),
+                               body=None)
+])
+def test_unexpected_probe_error_does_not_leave_breaker_half_open(error):
+    transport = GroqTransport("test-key", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    trip(transport.breaker)
+    transport.client = fake_client(error, "ok")
+
+    with pytest.raises(type(error)):
+        transport.create(model="test-model", messages=[])
+    # The probe failed, so the next call (after reset_timeout) probes again
+    assert transport.create(model="test-model", messages=[]) == "ok"
+    assert transport.breaker.state == "closed"
+
+
+def test_open_breaker_fails_fast():
+    transport = GroqTransport("test-key", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    trip(transport.breaker)
+    transport.client = fake_client("ok")
+
+    with pytest.raises(CircuitOpenError):
+        transport.create(model="test-model", messages=[])
+    assert transport.client.chat.completions.calls == 0
+
+
+def test_retryable_errors_are_retried_then_counted_once():
+    transport = GroqTransport("test-key", max_retries=2, backoff_base=0,
+                              breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    transport.client = fake_client(status_error(503), status_error(503), status_error(503))
+
+    with pytest.raises(APIStatusError):
+        transport.create(model="test-model", messages=[])
+    assert transport.client.chat.completions.calls == 3
+    assert transport.breaker.failures == 1
+
+
+def test_client_errors_do_not_count_against_the_upstream():
+    transport = GroqTransport("test-key", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    trip(transport.breaker)
+    transport.client = fake_client(status_error(400))
+
+    with pytest.raises(APIStatusError):
+        transport.create(model="test-model", messages=[])
+    assert transport.breaker.state == "closed"
+
+
+def test_timeout_bounds_the_call_including_retries():
+    request = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+    transport = GroqTransport("test-key", max_retries=5,
+                              breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    transport._retry_delay = lambda attempt, response=None: 1.0
+    timeouts = []
+
+    def create(**kwargs):
+        timeouts.append(kwargs["timeout"])
+        raise status_error(503) if len(timeouts) == 1 else APITimeoutError(request)
+
+    transport.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    with pytest.raises(APIStatusError):
+        transport.create(model="test-model", messages=[], timeout=0.5)
+    # The backoff would outlast the deadline, so there is no second attempt
+    assert len(timeouts) == 1 and 0 < timeouts[0].read <= 0.5
+
+
+def test_deadline_keeps_the_configured_connect_and_read_timeouts():
+    transport = GroqTransport("test-key", connect_timeout=2, read_timeout=5)
+    timeouts = []
+
+    def create(**kwargs):
+        timeouts.append(kwargs["timeout"])
+        return "ok"
+
+    transport.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    transport.create(model="test-model", messages=[], timeout=30)
+    transport.create(model="test-model", messages=[], timeout=1)
+
+    long_budget, short_budget = timeouts
+    assert long_budget.read == 5 and long_budget.connect == 2
+    assert short_budget.read <= 1 and short_budget.connect <= 1
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Answers every request after the server's delay"""
+    def do_POST(self):
+        time.sleep(self.server.delay)
+        self.send_response(503)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.delay = 2.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("budget", [None, 30])
+def test_slow_read_fails_at_the_read_timeout_within_a_longer_budget(slow_upstream, budget):
+    transport = GroqTransport("test-key", base_url=slow_upstream, read_timeout=0.3, max_retries=0)
+    options = {"timeout": budget} if budget is not None else {}
+
+    start = time.monotonic()
+    with pytest.raises(APITimeoutError):
+        transport.create(model="test-model", messages=[], **options)
+    assert time.monotonic() - start < 1.5
+    transport.close()
+
+
+def test_running_out_of_the_callers_deadline_does_not_trip_the_breaker():
+    request = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+    transport = GroqTransport("test-key", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+    trip(transport.breaker)
+
+    def create(**kwargs):
+        time.sleep(kwargs["timeout"].read)
+        raise APITimeoutError(request)
+
+    transport.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    with pytest.raises(APITimeoutError):
+        transport.create(model="test-model", messages=[], timeout=0.05)
+    assert transport.breaker.failures == 1
+    assert transport.breaker.allow()
+
+
+def test_cancelled_async_probe_is_released():
+    async def run():
+        transport = AsyncGroqTransport("test-key", breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0))
+        trip(transport.breaker)
+        started = asyncio.Event()
+
+        async def hang(**kwargs):
+            started.set()
+            await asyncio.sleep(60)
+
+        transport.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=hang)))
+        task = asyncio.ensure_future(transport.create(model="test-model", messages=[]))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert transport.breaker.allow()
+        await transport.close()
+
+    asyncio.run(run())
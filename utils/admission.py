@@ -0,0 +1,93 @@
+import threading
+import time
+
+from utils.metrics import ADMISSION_REJECTED, COALESCED
+
+
+class AdmissionRejected(Exception):
+    """Raised when an upstream call would exceed its rate budget; retry_after is in seconds"""
+    def __init__(self, message, retry_after=1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket admitting rate calls per second with bursts of up to capacity.
+    A caller that would have to wait at most max_wait seconds reserves its
+    token and sleeps (a short queue); anyone later than that is rejected.
+    """
+    def __init__(self, name, rate, capacity, max_wait=5.0):
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.max_wait = max_wait
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting briefly if needed; raises AdmissionRejected"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def reserve(self):
+        """
+        Take one token without sleeping (async callers await the wait themselves)
+        Returns: seconds to wait before the call; raises AdmissionRejected
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Tokens go negative while callers are queued for future refills
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > self.max_wait:
+                ADMISSION_REJECTED.inc(bucket=self.name)
+                raise AdmissionRejected(
+                    f"The {self.name} model is at capacity, please try again shortly",
+                    retry_after=wait - self.max_wait
+                )
+            self._tokens -= 1.0
+        return wait
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the
+    first caller runs it and everyone arriving meanwhile gets its result
+    (or its exception)
+    """
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = {"done": threading.Event(), "result": None, "error": None}
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            COALESCED.inc(call=self.name)
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func(*args)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
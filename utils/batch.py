@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def run_batch(recommender, items, max_workers=4):
+    """
+    Analyze many images with bounded concurrency.
+    items: iterable of dicts with "image" (path or file-like), "gender",
+    "dress_code" and optional "preferences" / "id".
+    Yields one record per item, in completion order:
+    {"index", "id", "status": "ok" | "error", "result" and/or "error"}
+    """
+    items = iter(enumerate(items))
+    # Keep a small backlog beyond the running workers so no slot sits idle,
+    # without materializing the whole batch up front
+    window = max_workers * 2
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="styleai-batch") as executor:
+        in_flight = {}
+
+        def fill():
+            while len(in_flight) < window:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    return
+                future = executor.submit(_analyze_item, recommender, item)
+                in_flight[future] = (index, item.get("id", index))
+
+        fill()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item_id = in_flight.pop(future)
+                record = {"index": index, "id": item_id}
+                try:
+                    record.update(future.result())
+                except Exception as e:
+                    record.update({"status": "error", "error": str(e)})
+                yield record
+            fill()
+
+
+def _analyze_item(recommender, item):
+    """Validate and analyze a single batch item"""
+    if item.get("error"):
+        return {"status": "error", "error": item["error"]}
+
+    is_valid, message = recommender.validate_inputs(item.get("gender"), item.get("dress_code"))
+    if not is_valid:
+        return {"status": "error", "error": message}
+
+    result = recommender.process_user_request(
+        item["image"], item["gender"], item["dress_code"], item.get("preferences", "")
+    )
+    # process_user_request degrades to generic advice when the image is unusable
+    if result.get("error"):
+        return {"status": "error", "error": result["error"], "result": result}
+    return {"status": "ok", "result": result}
@@ -0,0 +1,235 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from utils.db import SQLiteDatabase
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and optional JSON file backing
+    """
+    def __init__(self, max_entries=256, ttl=86400, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path:
+            self._load()
+
+    @staticmethod
+    def make_key(*parts):
+        """Build a cache key from request inputs"""
+        return "|".join(str(part) for part in parts)
+
+    def get(self, key):
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            if self.path:
+                self._persist()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self, prefix=""):
+        """Unexpired keys starting with prefix (no LRU or hit accounting)"""
+        now = time.time()
+        with self._lock:
+            return [
+                key for key, (expires_at, _) in self._entries.items()
+                if key.startswith(prefix) and expires_at >= now
+            ]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._persist()
+
+    def _load(self):
+        """Load unexpired entries from the backing file"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        for key, expires_at, value in stored[-self.max_entries:]:
+            if expires_at >= now:
+                self._entries[key] = (expires_at, value)
+
+    def _persist(self):
+        """Atomically rewrite the backing file (caller holds the lock)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([[key, expires_at, value] for key, (expires_at, value) in self._entries.items()], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: Could not persist response cache: {e}")
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at);
+"""
+
+
+class SQLiteCache:
+    """
+    Size-bounded LRU cache in a SQLite file (WAL mode) that every worker
+    process on the node shares, so entries survive restarts and are warm in
+    all workers. Same interface as ResponseCache; values must be JSON-able.
+    Several caches can share one file, each under its own namespace.
+    """
+    # Recency is refreshed at most this often per entry, so hot reads stay reads
+    TOUCH_INTERVAL = 60
+
+    make_key = staticmethod(ResponseCache.make_key)
+
+    def __init__(self, path, namespace, max_entries=256, ttl=86400):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db = SQLiteDatabase(path, SQLITE_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value, or None if missing, expired or unreadable"""
+        now = time.time()
+        try:
+            conn = self.db.connect()
+            row = conn.execute(
+                "SELECT expires_at, accessed_at, value FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is not None and row[0] < now:
+                with conn:
+                    conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+                row = None
+            elif row is not None and now - row[1] > self.TOUCH_INTERVAL:
+                with conn:
+                    conn.execute(
+                        "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                        (now, self.namespace, key)
+                    )
+        except sqlite3.Error as e:
+            print(f"Warning: Shared cache read failed: {e}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[2])
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries of this namespace"""
+        now = time.time()
+        try:
+            with self.db.connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, expires_at, accessed_at, value) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, now + self.ttl, now, json.dumps(value, separators=(",", ":")))
+                )
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT max(0, "
+                    "(SELECT COUNT(*) FROM cache_entries WHERE namespace = ?) - ?))",
+                    (self.namespace, self.namespace, self.namespace, self.max_entries)
+                )
+        except sqlite3.Error as e:
+            print(f"Warning: Shared cache write failed: {e}")
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self, prefix=""):
+        """Unexpired keys starting with prefix (no LRU or hit accounting)"""
+        try:
+            rows = self.db.connect().execute(
+                "SELECT key FROM cache_entries WHERE namespace = ? AND key >= ? AND key < ? AND expires_at >= ?",
+                (self.namespace, prefix, prefix + "\U0010ffff", time.time())
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Warning: Shared cache read failed: {e}")
+            return []
+        return [row[0] for row in rows]
+
+    def __len__(self):
+        try:
+            return self.db.connect().execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Warning: Shared cache read failed: {e}")
+            return 0
+
+    def clear(self):
+        try:
+            with self.db.connect() as conn:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"Warning: Shared cache write failed: {e}")
+
+
+def make_cache(backend, namespace, max_entries, ttl, path=None, db_path=None):
+    """
+    A cache for the configured backend: "memory" (per process, optionally
+    backed by the JSON file at path) or "sqlite" (shared across processes
+    through db_path)
+    """
+    if backend == "sqlite":
+        return SQLiteCache(db_path, namespace, max_entries=max_entries, ttl=ttl)
+    if backend != "memory":
+        print(f"Warning: Unknown cache backend {backend!r}, using memory")
+    return ResponseCache(max_entries=max_entries, ttl=ttl, path=path)
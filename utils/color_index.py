@@ -0,0 +1,221 @@
+import numpy as np
+from utils.colorspace import srgb_to_lab
+
+# sRGB values for every color name used in the skin tone palettes
+COLOR_HEX = {
+    "beige": "#F5F5DC",
+    "bright orange": "#FF7F00",
+    "bronze": "#CD7F32",
+    "brown": "#8B4513",
+    "burgundy": "#800020",
+    "charcoal": "#36454F",
+    "cobalt": "#0047AB",
+    "copper": "#B87333",
+    "coral": "#FF7F50",
+    "cream": "#FFFDD0",
+    "crimson": "#DC143C",
+    "deep purple": "#5B2A86",
+    "dusty rose": "#DCAE96",
+    "electric blue": "#7DF9FF",
+    "emerald green": "#50C878",
+    "forest green": "#228B22",
+    "fuchsia": "#FF00FF",
+    "gold": "#D4AF37",
+    "green": "#008000",
+    "hot pink": "#FF69B4",
+    "khaki": "#C3B091",
+    "lavender": "#B57EDC",
+    "lemon yellow": "#FFF44F",
+    "lime green": "#32CD32",
+    "magenta": "#CA1F7B",
+    "mint": "#98FF98",
+    "mint green": "#98FB98",
+    "muted olive": "#8A8A5C",
+    "muted tones": "#A39E93",
+    "navy": "#000080",
+    "navy blue": "#1F2A5C",
+    "neon colors": "#39FF14",
+    "neon shades": "#39FF14",
+    "neon yellow": "#DFFF11",
+    "orange": "#FFA500",
+    "peach": "#FFE5B4",
+    "plum": "#8E4585",
+    "pure white": "#FFFFFF",
+    "red": "#FF0000",
+    "royal blue": "#4169E1",
+    "rust": "#B7410E",
+    "silver": "#C0C0C0",
+    "soft pink": "#F4C2C2",
+    "soft white": "#F8F8F0",
+    "teal": "#008080",
+    "terracotta": "#E2725B",
+    "turquoise": "#40E0D0",
+    "yellow": "#FFFF00",
+    "yellow-green": "#9ACD32",
+}
+
+
+def color_hex(name):
+    """Hex value for a palette color name such as "Beige (too close to skin)", or None"""
+    return COLOR_HEX.get(name.split("(")[0].strip().lower())
+
+
+def hex_to_rgb(value):
+    value = value.lstrip("#")
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def rgb_to_hex(rgb):
+    return "#{:02X}{:02X}{:02X}".format(*(int(round(c)) for c in rgb))
+
+
+def dominant_colors(pixels, k=4, iterations=15, seed=0):
+    """
+    Vectorized k-means in Lab space over an (N, 3) uint8 RGB pixel array
+    Returns: list of {"hex", "lab", "share"} dicts, largest cluster first
+    """
+    pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+    lab = srgb_to_lab(pixels)
+    k = min(k, len(lab))
+    if k == 0:
+        return []
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding: spread the initial centers over the color distribution
+    centers = lab[[rng.integers(len(lab))]]
+    for _ in range(1, k):
+        distances = ((lab[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        if distances.sum() == 0:
+            break
+        centers = np.vstack([centers, lab[rng.choice(len(lab), p=distances / distances.sum())]])
+
+    for _ in range(iterations):
+        labels = ((lab[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.stack([np.bincount(labels, weights=lab[:, c], minlength=len(centers)) for c in range(3)], axis=1)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        converged = np.abs(updated - centers).max() < 0.5
+        centers = updated
+        if converged:
+            break
+
+    labels = ((lab[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    counts = np.bincount(labels, minlength=len(centers))
+    colors = []
+    for cluster in np.argsort(-counts):
+        if counts[cluster] == 0:
+            continue
+        # Report the mean sRGB of the cluster's pixels rather than inverting Lab
+        rgb = pixels[labels == cluster].mean(axis=0)
+        colors.append({
+            "hex": rgb_to_hex(rgb),
+            "lab": [float(v) for v in centers[cluster]],
+            "share": float(counts[cluster]) / len(lab)
+        })
+    return colors
+
+
+class KDTree:
+    """Static 3-d tree over a small point set for nearest-neighbour lookups"""
+    def __init__(self, points):
+        self.points = [tuple(float(v) for v in point) for point in points]
+        self.root = self._build(list(range(len(self.points))), 0)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+        return (indices[mid], axis,
+                self._build(indices[:mid], depth + 1),
+                self._build(indices[mid + 1:], depth + 1))
+
+    def nearest(self, point):
+        """Index of the closest point and its Euclidean distance"""
+        point = tuple(float(v) for v in point)
+        best = [None, float("inf")]
+
+        def search(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            candidate = self.points[index]
+            distance = sum((a - b) ** 2 for a, b in zip(candidate, point))
+            if distance < best[1]:
+                best[0], best[1] = index, distance
+
+            diff = point[axis] - candidate[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            search(near)
+            # The far side can only hold a closer point if the split plane is closer
+            if diff * diff < best[1]:
+                search(far)
+
+        search(self.root)
+        return best[0], best[1] ** 0.5
+
+
+class ColorIndex:
+    """
+    Named palette colors in Lab space, one KD-tree per skin tone, for scoring
+    colors found in a photo against the palette that suits that tone
+    """
+    # CIE76 distance (delta E) under which a color counts as a palette color
+    MATCH_DELTA_E = 20.0
+
+    def __init__(self, palettes):
+        self.palettes = {}
+        for skin_tone, palette in palettes.items():
+            entries = [
+                (name, category)
+                for category, names in palette.items()
+                for name in names
+                if color_hex(name)
+            ]
+            rgb = np.array([hex_to_rgb(color_hex(name)) for name, _ in entries], dtype=np.uint8)
+            self.palettes[skin_tone] = (entries, KDTree(srgb_to_lab(rgb)))
+
+    def match(self, colors, skin_tone):
+        """
+        Nearest palette color for each dominant color, a verdict and an overall
+        0-100 score (share-weighted: flattering 1, neutral 0.5, to avoid 0)
+        """
+        if skin_tone not in self.palettes or not colors:
+            return None
+        entries, tree = self.palettes[skin_tone]
+
+        matches, score = [], 0.0
+        for color in colors:
+            index, distance = tree.nearest(color["lab"])
+            name, category = entries[index]
+            if distance > self.MATCH_DELTA_E:
+                verdict, weight = "neutral", 0.5
+            elif category == "avoid":
+                verdict, weight = "avoid", 0.0
+            else:
+                verdict, weight = "flattering", 1.0
+            score += weight * color["share"]
+            matches.append({
+                "hex": color["hex"],
+                "share": round(color["share"], 3),
+                "nearest": name,
+                "category": category,
+                "delta_e": round(distance, 1),
+                "verdict": verdict
+            })
+
+        flattering = list(dict.fromkeys(m["nearest"] for m in matches if m["verdict"] == "flattering"))
+        avoid = list(dict.fromkeys(m["nearest"] for m in matches if m["verdict"] == "avoid"))
+        if avoid:
+            verb = "are" if len(avoid) > 1 else "is"
+            summary = (f"{', '.join(avoid)} {verb} not ideal for {skin_tone.lower()} skin; "
+                       f"swap in a primary palette color.")
+        elif flattering:
+            verb = "suit" if len(flattering) > 1 else "suits"
+            summary = f"{', '.join(flattering)} already {verb} your {skin_tone.lower()} skin tone."
+        else:
+            summary = "Your outfit colors are neutral for your skin tone; add a palette color near your face."
+
+        return {"colors": matches, "score": int(round(100 * score / sum(c["share"] for c in colors))),
+                "summary": summary}
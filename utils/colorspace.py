@@ -0,0 +1,37 @@
+import numpy as np
+
+# sRGB (D65) -> XYZ conversion matrix
+_SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041]
+], dtype=np.float32)
+
+# D65 reference white
+_WHITE_D65 = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+
+
+def srgb_to_lab(rgb):
+    """
+    Convert an (..., 3) array of 0-255 sRGB values to CIE Lab (D65)
+    """
+    rgb = np.asarray(rgb, dtype=np.float32) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = (linear @ _SRGB_TO_XYZ.T) / _WHITE_D65
+
+    delta = 6.0 / 29.0
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4.0 / 29.0)
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def individual_typology_angle(lab):
+    """
+    Individual Typology Angle (ITA, degrees) for an (..., 3) Lab array
+    """
+    lab = np.asarray(lab, dtype=np.float32)
+    return np.degrees(np.arctan2(lab[..., 0] - 50.0, lab[..., 2]))
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteDatabase:
+    """
+    A SQLite file shared by every worker process on the node, with one
+    connection per thread and process (connections must not cross a fork)
+    """
+    def __init__(self, path, schema):
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(schema)
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            # Readers never block the writer; losing the last commit on power loss is fine here
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
@@ -0,0 +1,55 @@
+import copy
+import json
+
+from utils.cache import ResponseCache
+
+
+class PerceptualHashIndex:
+    """
+    Near-duplicate index of analysis results keyed by a 64-bit perceptual
+    hash plus the request inputs. Entries live in a cache (in-process by
+    default, or a shared SQLiteCache), which handles LRU eviction and ttl.
+    """
+    def __init__(self, max_entries=1024, threshold=6, ttl=7 * 24 * 3600, store=None):
+        # Maximum Hamming distance (bits) for two hashes to count as the same photo
+        self.threshold = threshold
+        self.store = store if store is not None else ResponseCache(max_entries=max_entries, ttl=ttl)
+
+    @staticmethod
+    def make_key(gender, dress_code, preferences=""):
+        """Request inputs that must match exactly for a result to be reused"""
+        # JSON keeps one key from being a prefix of another (see lookup)
+        return json.dumps([gender, dress_code, " ".join((preferences or "").lower().split())])
+
+    @staticmethod
+    def _entry_key(image_hash, key):
+        return f"{key}|{image_hash:016x}"
+
+    def lookup(self, image_hash, key):
+        """
+        Find the closest stored result within the threshold
+        Returns: (result copy, distance) or (None, None)
+        """
+        best, best_distance = None, None
+        for entry_key in self.store.keys(f"{key}|"):
+            distance = (int(entry_key.rsplit("|", 1)[1], 16) ^ image_hash).bit_count()
+            if distance <= self.threshold and (best_distance is None or distance < best_distance):
+                best, best_distance = entry_key, distance
+                if distance == 0:
+                    break
+
+        if best is None:
+            return None, None
+
+        # get() refreshes the entry's recency (and may find it just evicted)
+        result = self.store.get(best)
+        if result is None:
+            return None, None
+        return copy.deepcopy(result), best_distance
+
+    def add(self, image_hash, key, result):
+        """Store a result for this image hash and request inputs"""
+        self.store.set(self._entry_key(image_hash, key), copy.deepcopy(result))
+
+    def __len__(self):
+        return len(self.store)
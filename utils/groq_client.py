@@ -1,22 +1,207 @@
+import asyncio
 import os
-from groq import Groq
 import json
+from utils.admission import AdmissionRejected, SingleFlight
+from utils.cache import ResponseCache
+from utils.transport import GroqTransport
+from utils.metrics import FALLBACKS, JSON_PARSE_FAILURES, record_usage, timed
+from utils.stream_parser import JSONSectionParser
+
+# Start of the tips text returned when the text model is unavailable
+FALLBACK_TIPS_PREFIX = "Could not fetch fashion tips"
 
 class GroqStylist:
-    def __init__(self, api_key):
-        self.client = Groq(api_key=api_key)
-        # Using vision-capable model for image analysis
-        self.vision_model = "llama-3.2-90b-vision-preview"
-        self.text_model = "llama-3.3-70b-versatile"
+    # Sections generated on request with the text model, after the core analysis
+    SECTION_SCHEMAS = {
+        "accessories": {
+            "jewelry": ["necklaces, earrings, etc."],
+            "bags": ["style and color recommendations"],
+            "watches": ["if applicable"],
+            "other": ["scarves, belts, etc."]
+        },
+        "hairstyle_suggestions": {
+            "recommended_styles": ["based on face shape"],
+            "maintenance_tips": ["care instructions"],
+            "color_recommendations": ["hair colors if applicable"]
+        },
+        "makeup_tips": {
+            "foundation": ["undertone matching"],
+            "lipstick": ["best shades"],
+            "eyeshadow": ["complementary colors"]
+        },
+        "shopping_links": {
+            "amazon_in": ["specific search terms for Amazon India"],
+            "myntra": ["specific search terms for Myntra"],
+            "ajio": ["specific search terms for Ajio"]
+        },
+        "styling_tips": ["3-5 practical styling tips"],
+        "confidence_boosters": ["how these choices enhance appearance"]
+    }
+    
+    VISION_MODEL = "llama-3.2-90b-vision-preview"
+    SMALL_VISION_MODEL = "llama-3.2-11b-vision-preview"
+    TEXT_MODEL = "llama-3.3-70b-versatile"
+    
+    def __init__(self, api_key, tips_cache=None, transport=None, vision_bucket=None, text_bucket=None,
+                 small_vision_bucket=None):
+        # Deadlines, retries, pooling and circuit breaking around the Groq client
+        self.transport = transport or GroqTransport(api_key)
+        self.client = self.transport.client
+        # Optional ResponseCache for get_fashion_tips (inputs are a closed set)
+        self.tips_cache = tips_cache
+        # Using vision-capable models for image analysis (the smaller one when the router asks)
+        self.vision_model = self.VISION_MODEL
+        self.small_vision_model = self.SMALL_VISION_MODEL
+        self.text_model = self.TEXT_MODEL
+        # Optional per-model TokenBuckets; identical concurrent calls share one request
+        self.buckets = {
+            self.vision_model: vision_bucket,
+            self.small_vision_model: small_vision_bucket,
+            self.text_model: text_bucket
+        }
+        self.inflight_tips = SingleFlight("tips")
+        self.inflight_sections = SingleFlight("section")
+    
+    def _create(self, **kwargs):
+        """transport.create behind the model's admission budget (may raise AdmissionRejected)"""
+        bucket = self.buckets.get(kwargs.get("model"))
+        if bucket is not None:
+            bucket.acquire()
+        return self.transport.create(**kwargs)
+    
+    def analyze_image_and_recommend(self, image_base64, skin_tone, gender, dress_code, user_preferences="",
+                                    mime_type="image/jpeg", model=None, timeout=None):
+        """
+        Comprehensive fashion analysis using Groq's vision model (or another vision model)
+        timeout (seconds) cuts the call short; the answer is then the fallback
+        """
+        messages = self._image_messages(image_base64, skin_tone, gender, dress_code, user_preferences, mime_type)
+        return self._recommend(messages, model or self.vision_model, skin_tone, timeout)
     
-    def analyze_image_and_recommend(self, image_base64, skin_tone, gender, dress_code, user_preferences=""):
+    def recommend_from_local_analysis(self, skin_tone, gender, dress_code, user_preferences="", garment_colors=None,
+                                      timeout=None):
         """
-        Comprehensive fashion analysis using Groq's vision model
+        Core recommendations from the text model, given the local skin tone and
+        garment color analysis instead of the image (the fast route)
         """
+        messages = self._local_analysis_messages(skin_tone, gender, dress_code, user_preferences, garment_colors)
+        return self._recommend(messages, self.text_model, skin_tone, timeout)
+    
+    @staticmethod
+    def _timeout_option(timeout):
+        # Left out when unset: an explicit None would disable the transport's deadlines
+        return {"timeout": timeout} if timeout is not None else {}
+    
+    def _recommend(self, messages, model, skin_tone, timeout=None):
+        """One core-analysis call; failures become fallback recommendations"""
+        try:
+            chat_completion = self._create(
+                messages=messages,
+                model=model,
+                temperature=0.7,
+                max_tokens=1024,
+                **self._timeout_option(timeout)
+            )
+            
+            response_content = chat_completion.choices[0].message.content
+            return self._parse_recommendations(response_content, skin_tone)
+        
+        except AdmissionRejected:
+            # Shed load is reported to the user rather than papered over
+            raise
+        except Exception as e:
+            return self._fallback_recommendations(skin_tone, e)
+    
+    def stream_image_recommendations(self, image_base64, skin_tone, gender, dress_code, user_preferences="",
+                                     mime_type="image/jpeg", model=None, timeout=None):
+        """
+        Streaming variant of analyze_image_and_recommend
+        Yields ("token", text) as tokens arrive, ("section", (name, value)) as each
+        top-level JSON section completes, and finally ("done", recommendations).
+        timeout bounds the wait for the response and between chunks.
+        """
+        messages = self._image_messages(image_base64, skin_tone, gender, dress_code, user_preferences, mime_type)
+        return self._stream_recommendations(messages, model or self.vision_model, skin_tone, timeout)
+    
+    def stream_local_analysis_recommendations(self, skin_tone, gender, dress_code, user_preferences="",
+                                              garment_colors=None, timeout=None):
+        """Streaming variant of recommend_from_local_analysis (same events as stream_image_recommendations)"""
+        messages = self._local_analysis_messages(skin_tone, gender, dress_code, user_preferences, garment_colors)
+        return self._stream_recommendations(messages, self.text_model, skin_tone, timeout)
+    
+    def _stream_recommendations(self, messages, model, skin_tone, timeout=None):
+        parser = JSONSectionParser()
+        
+        try:
+            stream = self._create(
+                messages=messages,
+                model=model,
+                temperature=0.7,
+                max_tokens=1024,
+                stream=True,
+                **self._timeout_option(timeout)
+            )
+            
+            for text in self._stream_text(stream, model):
+                yield "token", text
+                for section in parser.feed(text):
+                    yield "section", section
+            
+            yield "done", self._parse_recommendations(parser.buffer, skin_tone)
+            
+        except AdmissionRejected:
+            # Shed before any request was made; the caller reports it
+            raise
+        except Exception as e:
+            yield "error", str(e)
+            yield "done", self._fallback_recommendations(skin_tone, e)
+    
+    def _image_messages(self, image_base64, skin_tone, gender, dress_code, user_preferences, mime_type):
+        """Build the vision chat messages for a full analysis"""
         system_prompt = """You are an expert fashion stylist with deep knowledge of color theory, 
         body types, cultural fashion, and current trends. Provide detailed, actionable fashion advice."""
         
-        user_prompt = f"""Analyze this person's photo and provide comprehensive fashion recommendations.
+        user_prompt = self._core_prompt(
+            "Analyze this person's photo and provide the core fashion recommendations.",
+            skin_tone, gender, dress_code, user_preferences
+        )
+        
+        return [
+            {"role": "system", "content": system_prompt},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": user_prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{mime_type};base64,{image_base64}"
+                        }
+                    }
+                ]
+            }
+        ]
+    
+    def _local_analysis_messages(self, skin_tone, gender, dress_code, user_preferences, garment_colors):
+        """Build the text-only chat messages for a core analysis from local image analysis"""
+        worn = ", ".join(
+            f"{color['nearest']} ({color['hex']}, {round(color['share'] * 100)}%)" for color in garment_colors or []
+        ) or "unknown"
+        user_prompt = self._core_prompt(
+            "Provide the core fashion recommendations for a person whose photo was analyzed "
+            f"on our side.\n        Colors Currently Worn: {worn}",
+            skin_tone, gender, dress_code, user_preferences
+        )
+        
+        return [
+            {"role": "system", "content": "You are an expert fashion stylist with deep knowledge of color theory, "
+                                          "body types, cultural fashion, and current trends."},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _core_prompt(self, intro, skin_tone, gender, dress_code, user_preferences):
+        """Request for the core sections (skin tone analysis, outfits, palette)"""
+        return f"""{intro}
         
         Detected Skin Tone: {skin_tone}
         Gender Preference: {gender}
@@ -41,111 +226,212 @@ class GroqStylist:
                 "best_colors": ["list of 5-7 colors"],
                 "metal_tones": ["gold/silver/rose gold"],
                 "colors_to_avoid": ["list"]
-            }},
-            "accessories": {{
-                "jewelry": ["necklaces, earrings, etc."],
-                "bags": ["style and color recommendations"],
-                "watches": ["if applicable"],
-                "other": ["scarves, belts, etc."]
-            }},
-            "hairstyle_suggestions": {{
-                "recommended_styles": ["based on face shape"],
-                "maintenance_tips": ["care instructions"],
-                "color_recommendations": ["hair colors if applicable"]
-            }},
-            "makeup_tips": {{
-                "foundation": ["undertone matching"],
-                "lipstick": ["best shades"],
-                "eyeshadow": ["complementary colors"]
-            }},
-            "shopping_links": {{
-                "amazon_in": ["specific search terms for Amazon India"],
-                "myntra": ["specific search terms for Myntra"],
-                "ajio": ["specific search terms for Ajio"]
-            }},
-            "styling_tips": ["3-5 practical styling tips"],
-            "confidence_boosters": ["how these choices enhance appearance"]
+            }}
         }}
         
         Be specific, practical, and culturally relevant for Indian fashion context."""
+    
+    def generate_section(self, section, analysis, gender, dress_code, user_preferences=""):
+        """
+        Generate one secondary section with the text model, using the first-pass
+        analysis (skin analysis and core sections) as context instead of the image
+        """
+        key = ResponseCache.make_key(section, json.dumps(analysis, sort_keys=True), gender, dress_code, user_preferences)
+        return self.inflight_sections.do(key, self._generate_section, section, analysis, gender, dress_code,
+                                         user_preferences)
+    
+    def _generate_section(self, section, analysis, gender, dress_code, user_preferences):
+        chat_completion = self._create(
+            messages=self._section_messages(section, analysis, gender, dress_code, user_preferences),
+            model=self.text_model,
+            temperature=0.7,
+            max_tokens=512
+        )
+        
+        response_content = chat_completion.choices[0].message.content
+        with timed("json_parse"):
+            parsed = self._load_json(response_content)
+        if not isinstance(parsed, dict) or section not in parsed:
+            JSON_PARSE_FAILURES.inc()
+            raise ValueError(f"Could not parse the {section} section from the model answer")
+        return parsed[section]
+    
+    def _section_messages(self, section, analysis, gender, dress_code, user_preferences):
+        """Build the text-only chat messages for one secondary section"""
+        structure = json.dumps({section: self.SECTION_SCHEMAS[section]}, indent=4)
+        user_prompt = f"""Here is a fashion analysis of a person's photo:
+        {json.dumps(analysis)}
+        
+        Gender Preference: {gender}
+        Dress Code: {dress_code}
+        Additional Preferences: {user_preferences}
+        
+        Building on this analysis, provide a JSON response with the following structure:
+        {structure}
+        
+        Be specific, practical, and culturally relevant for Indian fashion context."""
+        
+        return [
+            {"role": "system", "content": "You are an expert fashion stylist with deep knowledge of color theory, "
+                                          "body types, cultural fashion, and current trends."},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _parse_recommendations(self, response_content, skin_tone):
+        """Parse the model's JSON answer, tolerating surrounding prose or fences"""
+        with timed("json_parse"):
+            parsed = self._load_json(response_content)
+        if parsed is not None:
+            return parsed
         
+        # If not valid JSON, create a structured response
+        JSON_PARSE_FAILURES.inc()
+        return {
+            "raw_response": response_content,
+            "skin_tone_analysis": {
+                "detected_tone": skin_tone,
+                "undertone": "neutral",
+                "color_harmony_explanation": "Based on detected skin tone"
+            },
+            "outfit_recommendations": {
+                "tops": ["Recommended tops based on analysis"],
+                "bottoms": ["Recommended bottoms based on analysis"],
+                "shoes": ["Footwear suggestions"],
+                "dresses": ["Dress recommendations if applicable"],
+                "outerwear": ["Jacket/coat suggestions"]
+            },
+            "color_palette": {
+                "best_colors": ["Colors that complement your skin tone"],
+                "metal_tones": ["Gold/Silver recommendations"],
+                "colors_to_avoid": ["Colors to avoid"]
+            }
+        }
+    
+    def _load_json(self, response_content):
+        """JSON object from the answer, or None"""
+        # Try to parse as JSON, then the outermost braces (prose or markdown fences)
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{image_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                model=self.vision_model,
-                temperature=0.7,
-                max_tokens=2048
-            )
-            
-            response_content = chat_completion.choices[0].message.content
-            
-            # Try to parse as JSON, if fails return raw response
+            return json.loads(response_content)
+        except json.JSONDecodeError:
+            pass
+        
+        start, end = response_content.find("{"), response_content.rfind("}")
+        if start != -1 and end > start:
             try:
-                return json.loads(response_content)
+                return json.loads(response_content[start:end + 1])
             except json.JSONDecodeError:
-                # If not valid JSON, create a structured response
-                return {
-                    "raw_response": response_content,
-                    "skin_tone_analysis": {
-                        "detected_tone": skin_tone,
-                        "undertone": "neutral",
-                        "color_harmony_explanation": "Based on detected skin tone"
-                    },
-                    "outfit_recommendations": {
-                        "tops": ["Recommended tops based on analysis"],
-                        "bottoms": ["Recommended bottoms based on analysis"],
-                        "shoes": ["Footwear suggestions"],
-                        "dresses": ["Dress recommendations if applicable"],
-                        "outerwear": ["Jacket/coat suggestions"]
-                    },
-                    "color_palette": {
-                        "best_colors": ["Colors that complement your skin tone"],
-                        "metal_tones": ["Gold/Silver recommendations"],
-                        "colors_to_avoid": ["Colors to avoid"]
-                    }
-                }
-                
-        except Exception as e:
-            # Fallback response if API fails
-            return {
-                "error": str(e),
-                "skin_tone_analysis": {
-                    "detected_tone": skin_tone,
-                    "undertone": "neutral",
-                    "color_harmony_explanation": f"Based on {skin_tone} skin tone analysis"
-                },
-                "outfit_recommendations": {
-                    "tops": ["Classic white shirt", "Navy blue blouse", "Earth tone sweater"],
-                    "bottoms": ["Dark jeans", "Beige trousers", "Black skirt"],
-                    "shoes": ["Brown leather shoes", "Nude heels", "White sneakers"],
-                    "dresses": ["A-line dress in complementary colors"],
-                    "outerwear": ["Blazer in navy or black"]
-                },
-                "color_palette": {
-                    "best_colors": ["Navy blue", "Burgundy", "Forest green", "Charcoal"],
-                    "metal_tones": ["Gold accessories work well"],
-                    "colors_to_avoid": ["Colors that clash with your undertone"]
-                }
+                pass
+        return None
+    
+    def _fallback_recommendations(self, skin_tone, error):
+        """Fallback response if API fails"""
+        FALLBACKS.inc(reason="vision_api")
+        return {
+            "error": str(error),
+            "skin_tone_analysis": {
+                "detected_tone": skin_tone,
+                "undertone": "neutral",
+                "color_harmony_explanation": f"Based on {skin_tone} skin tone analysis"
+            },
+            "outfit_recommendations": {
+                "tops": ["Classic white shirt", "Navy blue blouse", "Earth tone sweater"],
+                "bottoms": ["Dark jeans", "Beige trousers", "Black skirt"],
+                "shoes": ["Brown leather shoes", "Nude heels", "White sneakers"],
+                "dresses": ["A-line dress in complementary colors"],
+                "outerwear": ["Blazer in navy or black"]
+            },
+            "color_palette": {
+                "best_colors": ["Navy blue", "Burgundy", "Forest green", "Charcoal"],
+                "metal_tones": ["Gold accessories work well"],
+                "colors_to_avoid": ["Colors that clash with your undertone"]
             }
+        }
+    
+    def _stream_text(self, stream, model):
+        """Yield the non-empty text deltas of a streamed chat completion"""
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            # Groq reports token usage on the final chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                record_usage(model, x_groq.usage)
     
     def get_fashion_tips(self, skin_tone, gender, dress_code):
         """
         Get fashion tips without image analysis (text-only model)
         """
+        cache_key = ResponseCache.make_key("tips", skin_tone, gender, dress_code)
+        if self.tips_cache is not None:
+            cached = self.tips_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # A burst of identical requests waits for the first one's answer
+        return self.inflight_tips.do(cache_key, self._fetch_tips, cache_key, skin_tone, gender, dress_code)
+    
+    def _fetch_tips(self, cache_key, skin_tone, gender, dress_code):
+        try:
+            chat_completion = self._create(
+                messages=self._tips_messages(skin_tone, gender, dress_code),
+                model=self.text_model,
+                temperature=0.7,
+                max_tokens=1024
+            )
+            
+            tips = chat_completion.choices[0].message.content
+            if self.tips_cache is not None:
+                self.tips_cache.set(cache_key, tips)
+            return tips
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            FALLBACKS.inc(reason="tips_api")
+            return f"{FALLBACK_TIPS_PREFIX}: {str(e)}"
+    
+    @staticmethod
+    def is_fallback_tips(tips):
+        """Whether tips are the placeholder returned after an API failure"""
+        return not tips or tips.startswith(FALLBACK_TIPS_PREFIX)
+    
+    def stream_fashion_tips(self, skin_tone, gender, dress_code):
+        """
+        Streaming variant of get_fashion_tips
+        Yields ("token", text) events and finally ("done", full tips)
+        """
+        cache_key = ResponseCache.make_key("tips", skin_tone, gender, dress_code)
+        if self.tips_cache is not None:
+            cached = self.tips_cache.get(cache_key)
+            if cached is not None:
+                yield "token", cached
+                yield "done", cached
+                return
+        
+        parts = []
+        try:
+            stream = self._create(
+                messages=self._tips_messages(skin_tone, gender, dress_code),
+                model=self.text_model,
+                temperature=0.7,
+                max_tokens=1024,
+                stream=True
+            )
+            for text in self._stream_text(stream, self.text_model):
+                parts.append(text)
+                yield "token", text
+        except Exception as e:
+            FALLBACKS.inc(reason="tips_api")
+            yield "error", str(e)
+            yield "done", f"{FALLBACK_TIPS_PREFIX}: {str(e)}"
+            return
+        
+        tips = "".join(parts)
+        if self.tips_cache is not None:
+            self.tips_cache.set(cache_key, tips)
+        yield "done", tips
+    
+    def _tips_messages(self, skin_tone, gender, dress_code):
+        """Build the text-only chat messages for quick fashion tips"""
         prompt = f"""Provide fashion recommendations for:
         Skin Tone: {skin_tone}
         Gender: {gender}
@@ -153,17 +439,87 @@ class GroqStylist:
         
         Include color recommendations, outfit ideas, and styling tips."""
         
+        return [
+            {"role": "system", "content": "You are a professional fashion stylist."},
+            {"role": "user", "content": prompt}
+        ]
+
+
+class AsyncGroqStylist:
+    """
+    Asyncio counterpart of a GroqStylist for the ASGI serving mode: core
+    analyses and tips over an AsyncGroqTransport. Prompts, parsing, fallbacks,
+    per-model budgets and the tips cache are the given stylist's, so both
+    modes draw on the same budgets and cached tips. Cache reads and writes
+    run on executor, off the event loop.
+    """
+    def __init__(self, stylist, transport, executor=None):
+        self.stylist = stylist
+        self.transport = transport
+        self.executor = executor
+    
+    async def _create(self, **kwargs):
+        """transport.create behind the model's admission budget (may raise AdmissionRejected)"""
+        bucket = self.stylist.buckets.get(kwargs.get("model"))
+        if bucket is not None:
+            wait = bucket.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return await self.transport.create(**kwargs)
+    
+    async def analyze_image_and_recommend(self, image_base64, skin_tone, gender, dress_code, user_preferences="",
+                                          mime_type="image/jpeg", model=None, timeout=None):
+        messages = self.stylist._image_messages(image_base64, skin_tone, gender, dress_code, user_preferences,
+                                                mime_type)
+        return await self._recommend(messages, model or self.stylist.vision_model, skin_tone, timeout)
+    
+    async def recommend_from_local_analysis(self, skin_tone, gender, dress_code, user_preferences="",
+                                            garment_colors=None, timeout=None):
+        messages = self.stylist._local_analysis_messages(skin_tone, gender, dress_code, user_preferences,
+                                                         garment_colors)
+        return await self._recommend(messages, self.stylist.text_model, skin_tone, timeout)
+    
+    async def _recommend(self, messages, model, skin_tone, timeout=None):
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": "You are a professional fashion stylist."},
-                    {"role": "user", "content": prompt}
-                ],
-                model=self.text_model,
+            chat_completion = await self._create(
+                messages=messages,
+                model=model,
+                temperature=0.7,
+                max_tokens=1024,
+                **self.stylist._timeout_option(timeout)
+            )
+            
+            response_content = chat_completion.choices[0].message.content
+            return self.stylist._parse_recommendations(response_content, skin_tone)
+        
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            return self.stylist._fallback_recommendations(skin_tone, e)
+    
+    async def get_fashion_tips(self, skin_tone, gender, dress_code):
+        loop = asyncio.get_running_loop()
+        tips_cache = self.stylist.tips_cache
+        cache_key = ResponseCache.make_key("tips", skin_tone, gender, dress_code)
+        if tips_cache is not None:
+            cached = await loop.run_in_executor(self.executor, tips_cache.get, cache_key)
+            if cached is not None:
+                return cached
+        
+        try:
+            chat_completion = await self._create(
+                messages=self.stylist._tips_messages(skin_tone, gender, dress_code),
+                model=self.stylist.text_model,
                 temperature=0.7,
                 max_tokens=1024
             )
             
-            return chat_completion.choices[0].message.content
+            tips = chat_completion.choices[0].message.content
+            if tips_cache is not None:
+                await loop.run_in_executor(self.executor, tips_cache.set, cache_key, tips)
+            return tips
+        except AdmissionRejected:
+            raise
         except Exception as e:
-            return f"Could not fetch fashion tips: {str(e)}"
\ No newline at end of file
+            FALLBACKS.inc(reason="tips_api")
+            return f"{FALLBACK_TIPS_PREFIX}: {str(e)}"
@@ -1,34 +1,262 @@
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import base64
-import random
+import numpy as np
+from utils.colorspace import srgb_to_lab, individual_typology_angle
+from utils.color_index import ColorIndex, dominant_colors
 
 class ImageProcessor:
-    def __init__(self):
-        # Simple initialization without OpenCV dependencies
-        pass
+    # ITA (degrees) boundaries: above FAIR_ITA is Fair, at or below DEEP_ITA is Deep
+    FAIR_ITA = 41.0
+    DEEP_ITA = 10.0
+    # Lab hue angle (degrees) at which an intermediate tone reads as Olive
+    OLIVE_HUE = 62.0
+    # Fraction of skin pixels considered a well-exposed portrait
+    FULL_COVERAGE = 0.15
+    MIN_SKIN_PIXELS = 64
+
+    # Face search runs on a copy with this longest edge; window widths are
+    # fractions of its shorter side and windows are 1.3x taller than wide
+    DETECTION_SIZE = 160
+    FACE_SCALES = (0.1, 0.15, 0.22, 0.32, 0.45, 0.6)
+    FACE_ASPECT = 1.3
+    # Minimum skin fraction inside, and skin contrast against the surrounding ring
+    MIN_FACE_DENSITY = 0.45
+    MIN_FACE_CONTRAST = 0.2
+    # Crops keeping more than this fraction of the image are not worth making
+    MAX_CROP_FRACTION = 0.85
+
+    # Garment colors: clusters over a copy of the torso region with this longest edge
+    GARMENT_SIZE = 64
+    GARMENT_CLUSTERS = 4
+    MIN_GARMENT_PIXELS = 200
+
+    # Encoders available for the normalized image sent to the vision model
+    OUTPUT_FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+    def __init__(self, analysis_size=128, max_edge=1024, output_format="JPEG", quality=85):
+        # Longest edge (pixels) of the working copy used for skin analysis
+        self.analysis_size = analysis_size
+        # Normalized image settings for API transmission
+        self.max_edge = max_edge
+        self.output_format = output_format.upper()
+        self.quality = quality
+        if self.output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported image format: {output_format}")
+        # Lab values and KD-trees for the named palette colors
+        self.color_index = ColorIndex({
+            tone: self._get_palette(tone) for tone in ("Fair", "Medium", "Olive", "Deep")
+        })
     
     def detect_face(self, image_path):
-        """Simple face detection simulation (returns full image)"""
-        try:
-            img = Image.open(image_path)
-            return img, img
-        except Exception:
-            raise ValueError("Could not load image")
+        """
+        Locate the most face-like skin region: a sliding-window search over the
+        integral image of the skin mask of a downscaled copy, scoring windows by
+        skin density against the ring around them (faces are skin blobs framed
+        by hair, background and clothing) with a mild preference for the top.
+        Returns: face box and upper-body box as (left, top, right, bottom) in
+        image pixels, or (None, None) if nothing face-like is found
+        """
+        img = image_path if isinstance(image_path, Image.Image) else self.normalize_image(image_path)
+        small = img.convert("RGB") if img.mode != "RGB" else img.copy()
+        small.thumbnail((self.DETECTION_SIZE, self.DETECTION_SIZE), Image.Resampling.BILINEAR)
+        mask = self._skin_mask(small)
+        h, w = mask.shape
+        
+        integral = np.zeros((h + 1, w + 1), dtype=np.int32)
+        integral[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+        
+        def box_sum(y0, x0, y1, x1):
+            return integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+        
+        best = None
+        for scale in self.FACE_SCALES:
+            fw = max(4, int(round(min(h, w) * scale)))
+            fh = int(round(fw * self.FACE_ASPECT))
+            if fw > w or fh > h:
+                continue
+            stride = max(1, fw // 4)
+            y = np.arange(0, h - fh + 1, stride)[:, None]
+            x = np.arange(0, w - fw + 1, stride)[None, :]
+            
+            inner = box_sum(y, x, y + fh, x + fw)
+            density = inner / float(fw * fh)
+            
+            # Ring of half a window on each side, clipped to the image
+            oy0, oy1 = np.clip(y - fh // 2, 0, h), np.clip(y + fh + fh // 2, 0, h)
+            ox0, ox1 = np.clip(x - fw // 2, 0, w), np.clip(x + fw + fw // 2, 0, w)
+            ring_area = np.maximum((oy1 - oy0) * (ox1 - ox0) - fw * fh, 1)
+            ring = (box_sum(oy0, ox0, oy1, ox1) - inner) / ring_area
+            
+            contrast = density - ring
+            score = contrast * (1.0 - 0.3 * y / h)
+            score[(density < self.MIN_FACE_DENSITY) | (contrast < self.MIN_FACE_CONTRAST)] = -1.0
+            
+            i, j = np.unravel_index(int(np.argmax(score)), score.shape)
+            if score[i, j] > 0 and (best is None or score[i, j] > best[0]):
+                best = (float(score[i, j]), int(x[0, j]), int(y[i, 0]), fw, fh)
+        
+        if best is None:
+            return None, None
+        
+        _, x, y, fw, fh = best
+        factor = img.width / float(w)
+        face_box = self._clip_box((x, y, x + fw, y + fh), factor, img.size)
+        # Head and shoulders down to the waist: what outfit advice needs to see
+        person_box = self._clip_box((x - 1.25 * fw, y - 0.5 * fh, x + 2.25 * fw, y + 4.0 * fh), factor, img.size)
+        return face_box, person_box
+    
+    @staticmethod
+    def _clip_box(box, factor, size):
+        """Scale a detection-space box to image pixels, clipped to the image"""
+        left, top, right, bottom = (int(round(v * factor)) for v in box)
+        return max(0, left), max(0, top), min(size[0], right), min(size[1], bottom)
+    
+    def regions_of_interest(self, img):
+        """
+        Regions of a normalized image worth analysing
+        Returns: skin region (the face), vision region (upper body) and the face box;
+        both regions are the whole image when no face is found or a crop saves little
+        """
+        face_box, person_box = self.detect_face(img)
+        if face_box is None:
+            return img, img, None
+        
+        area = float(img.width * img.height)
+        person_area = (person_box[2] - person_box[0]) * (person_box[3] - person_box[1])
+        vision_region = img.crop(person_box) if person_area < self.MAX_CROP_FRACTION * area else img
+        return img.crop(face_box), vision_region, face_box
     
     def analyze_skin_tone(self, image_path):
         """
-        Simulated skin tone detection (random for demo purposes)
+        Skin tone detection from ITA/Lab statistics over skin pixels
         Returns: skin_tone_category, confidence, color_palette
         """
-        # For demo purposes, return random skin tone
-        skin_tones = ["Fair", "Medium", "Olive", "Deep"]
-        skin_tone = random.choice(skin_tones)
-        confidence = round(random.uniform(0.7, 0.95), 2)
+        stats = self.skin_statistics(image_path)
+        skin_tone, confidence = self._classify_skin_tone(stats)
         palette = self._get_palette(skin_tone)
         
         return skin_tone, confidence, palette
     
+    def skin_statistics(self, image_path):
+        """
+        Compute ITA, Lab hue angle and coverage over the skin-pixel mask
+        of a downsampled working copy of the image
+        """
+        img = self._load_working_image(image_path)
+        rgb = np.asarray(img, dtype=np.uint8).reshape(-1, 3)
+        mask = self._skin_mask(img).reshape(-1)
+        
+        coverage = float(mask.mean()) if mask.size else 0.0
+        if mask.sum() >= self.MIN_SKIN_PIXELS:
+            pixels = rgb[mask]
+        else:
+            # Too few skin pixels: sample the central region instead
+            h, w = img.height, img.width
+            center = np.asarray(img, dtype=np.uint8)[h // 4:h - h // 4, w // 4:w - w // 4]
+            pixels = center.reshape(-1, 3) if center.size else rgb
+            coverage = 0.0
+        
+        lab = srgb_to_lab(pixels)
+        ita = individual_typology_angle(lab)
+        hue = np.degrees(np.arctan2(lab[:, 2], lab[:, 1]))
+        q1, median_ita, q3 = np.percentile(ita, [25, 50, 75])
+        
+        return {
+            "ita": float(median_ita),
+            "ita_spread": float(q3 - q1),
+            "hue_angle": float(np.median(hue)),
+            "lab": [float(v) for v in np.median(lab, axis=0)],
+            "coverage": coverage,
+            "pixels": int(pixels.shape[0])
+        }
+    
+    def garment_colors(self, img, face_box=None):
+        """
+        Dominant clothing colors: k-means over the torso below the detected face
+        (or the lower centre of the image), ignoring skin pixels
+        Returns: list of {"hex", "lab", "share"}, largest first
+        """
+        if face_box is not None:
+            left, top, right, bottom = face_box
+            fw, fh = right - left, bottom - top
+            box = (left - 0.75 * fw, bottom + 0.25 * fh, right + 0.75 * fw, bottom + 3.0 * fh)
+        else:
+            box = (img.width / 4, img.height / 3, img.width * 3 / 4, img.height)
+        box = self._clip_box(box, 1.0, img.size)
+        if box[2] - box[0] < 8 or box[3] - box[1] < 8:
+            return []
+        
+        region = img.crop(box)
+        region.thumbnail((self.GARMENT_SIZE, self.GARMENT_SIZE), Image.Resampling.BILINEAR)
+        region = region.convert("RGB")
+        pixels = np.asarray(region, dtype=np.uint8).reshape(-1, 3)
+        clothing = ~self._skin_mask(region).reshape(-1)
+        if clothing.sum() >= self.MIN_GARMENT_PIXELS:
+            pixels = pixels[clothing]
+        return dominant_colors(pixels, k=self.GARMENT_CLUSTERS)
+    
+    def color_match(self, img, skin_tone, face_box=None):
+        """Score the colors being worn against the palette for skin_tone (None if no colors)"""
+        return self.color_index.match(self.garment_colors(img, face_box), skin_tone)
+    
+    def _load_working_image(self, image_path):
+        """Decode a small RGB working copy of the image"""
+        try:
+            img = image_path if isinstance(image_path, Image.Image) else Image.open(image_path)
+        except Exception:
+            raise ValueError("Could not load image")
+        
+        size = (self.analysis_size, self.analysis_size)
+        # Let the JPEG decoder scale by 1/2..1/8 instead of decoding full size
+        if img.format == "JPEG":
+            img.draft("RGB", size)
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        else:
+            img = img.copy()
+        img.thumbnail(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        return img.convert("RGB")
+    
+    def _skin_mask(self, img):
+        """Boolean skin-pixel mask combining YCrCb and HSV rules"""
+        ycc = np.asarray(img.convert("YCbCr"))
+        hsv = np.asarray(img.convert("HSV"))
+        cb, cr = ycc[..., 1], ycc[..., 2]
+        hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+        
+        # Cr 133-173 / Cb 77-127 is the classic chrominance skin cluster;
+        # PIL scales hue and saturation to 0-255 (hue <= 50deg or >= 340deg)
+        chroma = (cr >= 133) & (cr <= 173) & (cb >= 77) & (cb <= 127)
+        tone = ((hue <= 35) | (hue >= 241)) & (sat >= 26) & (sat <= 174) & (val >= 50)
+        return chroma & tone
+    
+    def _classify_skin_tone(self, stats):
+        """Map ITA/hue statistics to a Config.SKIN_TONES category and confidence"""
+        ita, hue = stats["ita"], stats["hue_angle"]
+        
+        if ita > self.FAIR_ITA:
+            skin_tone, margin = "Fair", ita - self.FAIR_ITA
+        elif ita <= self.DEEP_ITA:
+            skin_tone, margin = "Deep", self.DEEP_ITA - ita
+        else:
+            margin = min(ita - self.DEEP_ITA, self.FAIR_ITA - ita)
+            if hue >= self.OLIVE_HUE:
+                skin_tone = "Olive"
+            else:
+                skin_tone = "Medium"
+            margin = min(margin, abs(hue - self.OLIVE_HUE))
+        
+        # Distance from the nearest boundary relative to the pixel spread,
+        # scaled by how much of the image is actually skin: with no skin
+        # pixels the tone is a guess from the image centre, so confidence is 0
+        spread = stats["ita_spread"] / 2.0 + 1.0
+        decisiveness = margin / (margin + spread)
+        coverage = min(1.0, stats["coverage"] / self.FULL_COVERAGE)
+        confidence = (0.5 + 0.45 * decisiveness) * coverage
+        
+        return skin_tone, round(confidence, 2)
+    
     # Removed OpenCV-dependent methods for compatibility
     
     def _get_palette(self, skin_tone):
@@ -61,7 +289,61 @@ class ImageProcessor:
         }
         return palettes.get(skin_tone, palettes["Medium"])
     
+    def normalize_image(self, image_path):
+        """
+        Decode an upload in memory: first frame only, EXIF orientation applied,
+        alpha flattened and downscaled to max_edge
+        """
+        try:
+            img = Image.open(image_path)
+        except Exception:
+            raise ValueError("Could not load image")
+        
+        size = (self.max_edge, self.max_edge)
+        if img.format == "JPEG":
+            img.draft("RGB", size)
+        if getattr(img, "is_animated", False):
+            img.seek(0)
+        img = ImageOps.exif_transpose(img)
+        
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        
+        img.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return img
+    
+    def perceptual_hash(self, img):
+        """
+        64-bit difference hash (dHash) of an image: stable across re-saves,
+        resizes and recompression of the same photo
+        """
+        if not isinstance(img, Image.Image):
+            img = self.normalize_image(img)
+        gray = np.asarray(img.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+        bits = (gray[:, 1:] > gray[:, :-1]).reshape(-1)
+        return int(np.packbits(bits).view(">u8")[0])
+    
+    def encode_image(self, img):
+        """
+        Re-encode a normalized image
+        Returns: image bytes, mime type
+        """
+        buffer = io.BytesIO()
+        if self.output_format == "WEBP":
+            img.save(buffer, format="WEBP", quality=self.quality, method=4)
+        else:
+            img.save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        return buffer.getvalue(), self.OUTPUT_FORMATS[self.output_format]
+    
     def get_image_base64(self, image_path):
-        """Convert image to base64 for API transmission"""
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
\ No newline at end of file
+        """
+        Normalize image and convert to base64 for API transmission
+        Returns: base64 string, mime type
+        """
+        img = image_path if isinstance(image_path, Image.Image) else self.normalize_image(image_path)
+        data, mime_type = self.encode_image(img)
+        return base64.b64encode(data).decode('utf-8'), mime_type
\ No newline at end of file
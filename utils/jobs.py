@@ -0,0 +1,73 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue has no free slots"""
+    pass
+
+
+class JobManager:
+    """
+    Runs slow analyses on a bounded worker pool. Job status is kept in the
+    shared result store (see ResultStore.put_job), so a status poll can land
+    on any worker process; records expire ttl seconds after finishing.
+    """
+    def __init__(self, store, max_workers=4, max_pending=32, ttl=3600):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="styleai-job")
+        self.store = store
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Enqueue func(*args, **kwargs), which returns the id of the result it
+        stored, and return the job id.
+        Raises JobQueueFull when max_pending jobs of this worker are already queued or running.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull("Too many analyses in progress, please try again shortly")
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.prune_jobs(time.time() - self.ttl)
+            self.store.put_job({"id": job_id, "status": "queued", "created_at": time.time()})
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        self.executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def get(self, job_id):
+        """Return the job record, or None if unknown or expired"""
+        job = self.store.get_job(job_id)
+        if job is None or (job["finished_at"] is not None and job["finished_at"] < time.time() - self.ttl):
+            return None
+        return job
+
+    def stats(self):
+        """Counts of jobs by status"""
+        return self.store.job_counts()
+
+    def _run(self, job_id, func, args, kwargs):
+        try:
+            self.store.update_job(job_id, status="running", started_at=time.time())
+            try:
+                result_id = func(*args, **kwargs)
+            except Exception as e:
+                self.store.update_job(job_id, status="failed", error=str(e), finished_at=time.time())
+            else:
+                self.store.update_job(job_id, status="done", result_id=result_id, finished_at=time.time())
+        except Exception as e:
+            print(f"Warning: Could not record status of job {job_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
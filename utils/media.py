@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+
+# Derivative name -> (width in px, PIL format). Rendered output for a given
+# upload never changes, so their URLs can be cached forever.
+VARIANTS = {
+    "thumb.jpg": (200, "JPEG"),
+    "thumb.webp": (200, "WEBP"),
+    "medium.jpg": (480, "JPEG"),
+    "medium.webp": (480, "WEBP"),
+}
+
+MIMETYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+class MediaStore:
+    """
+    Resized JPEG/WebP derivatives of uploads in an UploadStore, rendered on
+    first request and kept next to the original (so the upload sweeper
+    bounds them too). Files are named <digest>.<variant>.
+    """
+    def __init__(self, upload_store, extensions=("jpg", "png", "gif", "webp"), quality=80):
+        self.upload_store = upload_store
+        # UploadStore names files by these extensions ("jpeg" is stored as "jpg")
+        self.extensions = sorted({"jpg" if e == "jpeg" else e for e in extensions})
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._rendering = {}
+
+    @staticmethod
+    def split(filename):
+        """(digest, extension) of a stored upload file name, or (None, None)"""
+        digest, _, extension = filename.rpartition("/")[2].partition(".")
+        if not DIGEST_PATTERN.match(digest):
+            return None, None
+        return digest, extension
+
+    def original(self, digest):
+        """Path of the stored upload with this digest, or None"""
+        for extension in self.extensions:
+            path = self.upload_store.path(f"{digest}.{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def derivative(self, digest, variant):
+        """
+        Path and mimetype of a derivative, rendering it if needed
+        Returns: (path, mimetype) or (None, None) for unknown uploads/variants
+        """
+        if variant not in VARIANTS or not DIGEST_PATTERN.match(digest):
+            return None, None
+        width, image_format = VARIANTS[variant]
+        path = self.upload_store.path(f"{digest}.{variant}")
+        if os.path.exists(path):
+            return path, MIMETYPES[image_format]
+
+        # One render per file; concurrent requests for it wait for that render
+        with self._lock:
+            event = self._rendering.get(path)
+            leader = event is None
+            if leader:
+                event = self._rendering[path] = threading.Event()
+        if not leader:
+            event.wait()
+        else:
+            try:
+                source = self.original(digest)
+                if source is not None:
+                    self._render(source, path, width, image_format)
+            except Exception as e:
+                # Uploads are stored before analysis, so some are not decodable images
+                print(f"Warning: Could not render {digest}.{variant}: {e}")
+            finally:
+                with self._lock:
+                    del self._rendering[path]
+                event.set()
+
+        if not os.path.exists(path):
+            return None, None
+        return path, MIMETYPES[image_format]
+
+    def _render(self, source, path, width, image_format):
+        # Imported here so the web process does not load PIL until an image is needed
+        from PIL import Image, ImageOps
+
+        with Image.open(source) as img:
+            # JPEGs decode straight at the smallest 1/2^n scale that is still >= width
+            # on both edges (either may become the width after EXIF rotation)
+            img.draft("RGB", (width, width))
+            img = ImageOps.exif_transpose(img).convert("RGB")
+        if img.width > width:
+            img = img.resize((width, max(1, round(img.height * width / img.width))), Image.LANCZOS)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if image_format == "JPEG":
+                img.save(tmp_path, "JPEG", quality=self.quality, optimize=True, progressive=True)
+            else:
+                img.save(tmp_path, "WEBP", quality=self.quality, method=4)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,180 @@
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(float(bound)))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format"""
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide metrics (each worker process exposes its own)
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "styleai_stage_duration_seconds",
+    "Time spent in each recommendation pipeline stage",
+    ["stage"]
+)
+REQUEST_DURATION = registry.histogram(
+    "styleai_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["route", "method", "status"]
+)
+FALLBACKS = registry.counter(
+    "styleai_fallback_total",
+    "Responses served from fallback recommendations",
+    ["reason"]
+)
+JSON_PARSE_FAILURES = registry.counter(
+    "styleai_json_parse_failures_total",
+    "Model answers that could not be parsed as JSON"
+)
+API_ERRORS = registry.counter(
+    "styleai_api_errors_total",
+    "Failed upstream Groq API calls",
+    ["model", "error"]
+)
+TOKENS = registry.counter(
+    "styleai_llm_tokens_total",
+    "Tokens reported by the Groq API",
+    ["model", "kind"]
+)
+
+ADMISSION_REJECTED = registry.counter(
+    "styleai_admission_rejected_total",
+    "Upstream calls shed by the per-model token bucket",
+    ["bucket"]
+)
+COALESCED = registry.counter(
+    "styleai_coalesced_calls_total",
+    "Calls that shared an identical in-flight upstream call",
+    ["call"]
+)
+ROUTE_DECISIONS = registry.counter(
+    "styleai_route_decisions_total",
+    "Image analyses by chosen upstream route and why it was chosen",
+    ["route", "reason"]
+)
+
+
+def timed(stage):
+    """Context manager recording the duration of a pipeline stage"""
+    return STAGE_DURATION.time(stage=stage)
+
+
+def record_usage(model, usage):
+    """Count prompt/completion tokens from a Groq usage object"""
+    if usage is None:
+        return
+    TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, kind="prompt")
+    TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, kind="completion")
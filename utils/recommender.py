@@ -1,59 +1,392 @@
 from utils.image_processor import ImageProcessor
-from utils.groq_client import GroqStylist
+from utils.groq_client import AsyncGroqStylist, GroqStylist
+from utils.cache import ResponseCache, make_cache
+from utils.dedup import PerceptualHashIndex
+from utils.transport import AsyncGroqTransport, GroqTransport, CircuitBreaker
+from utils.admission import AdmissionRejected, TokenBucket
+from utils.routing import ModelRouter, Route
+from utils.metrics import FALLBACKS, timed
+from config import Config
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
+import threading
+import time
 
 class FashionRecommender:
+    # Skin tone assumed when the image cannot be analyzed
+    FALLBACK_TONE = "Medium"
+    
     def __init__(self, groq_api_key):
-        self.image_processor = ImageProcessor()
-        self.groq_stylist = GroqStylist(groq_api_key)
+        self.groq_api_key = groq_api_key
+        self.image_processor = ImageProcessor(
+            Config.SKIN_ANALYSIS_SIZE,
+            max_edge=Config.IMAGE_MAX_EDGE,
+            output_format=Config.IMAGE_FORMAT,
+            quality=Config.IMAGE_QUALITY
+        )
+        # Shared by every worker process on the node with CACHE_BACKEND=sqlite
+        self.tips_cache = make_cache(
+            Config.CACHE_BACKEND, "tips",
+            max_entries=Config.TIPS_CACHE_SIZE,
+            ttl=Config.TIPS_CACHE_TTL,
+            path=Config.TIPS_CACHE_PATH,
+            db_path=Config.CACHE_DB_PATH
+        )
+        self.transport = GroqTransport(
+            groq_api_key,
+            base_url=Config.GROQ_BASE_URL,
+            connect_timeout=Config.GROQ_CONNECT_TIMEOUT,
+            read_timeout=Config.GROQ_READ_TIMEOUT,
+            max_retries=Config.GROQ_MAX_RETRIES,
+            max_connections=Config.GROQ_POOL_SIZE,
+            max_keepalive=Config.GROQ_POOL_SIZE,
+            breaker=CircuitBreaker(Config.GROQ_BREAKER_THRESHOLD, Config.GROQ_BREAKER_RESET)
+        )
+        self.groq_stylist = GroqStylist(
+            groq_api_key,
+            tips_cache=self.tips_cache,
+            transport=self.transport,
+            vision_bucket=TokenBucket(
+                "vision", Config.GROQ_VISION_RATE, Config.GROQ_VISION_BURST, Config.ADMISSION_MAX_WAIT
+            ) if Config.GROQ_VISION_RATE > 0 else None,
+            text_bucket=TokenBucket(
+                "text", Config.GROQ_TEXT_RATE, Config.GROQ_TEXT_BURST, Config.ADMISSION_MAX_WAIT
+            ) if Config.GROQ_TEXT_RATE > 0 else None,
+            small_vision_bucket=TokenBucket(
+                "vision_small", Config.GROQ_VISION_RATE, Config.GROQ_VISION_BURST, Config.ADMISSION_MAX_WAIT
+            ) if Config.GROQ_VISION_RATE > 0 else None
+        )
+        # Image analyses go to the most capable route expected to fit the latency budget
+        routes = {
+            "vision": Route("vision", self.groq_stylist.vision_model, vision=True),
+            "vision_small": Route("vision_small", self.groq_stylist.small_vision_model, vision=True),
+            "text": Route("text", self.groq_stylist.text_model, vision=False)
+        }
+        self.router = ModelRouter(
+            [routes[name] for name in Config.ROUTING_ROUTES],
+            budget=Config.ROUTING_LATENCY_BUDGET,
+            max_error_rate=Config.ROUTING_MAX_ERROR_RATE,
+            probe_interval=Config.ROUTING_PROBE_INTERVAL
+        )
+        self.dedup_index = PerceptualHashIndex(
+            threshold=Config.DEDUP_THRESHOLD,
+            store=make_cache(
+                Config.CACHE_BACKEND, "dedup",
+                max_entries=Config.DEDUP_MAX_ENTRIES,
+                ttl=Config.DEDUP_TTL,
+                db_path=Config.CACHE_DB_PATH
+            )
+        ) if Config.DEDUP_ENABLED else None
+        # ASGI mode: image work runs here, off the event loop; the asyncio client is built on first use
+        self.cpu_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_CPU_WORKERS,
+                                               thread_name_prefix="styleai-cpu")
+        self._async_stylist = None
+        self._async_lock = threading.Lock()
+    
+    @property
+    def async_stylist(self):
+        """AsyncGroqStylist sharing this recommender's budgets, tips cache and circuit breaker"""
+        if self._async_stylist is None:
+            with self._async_lock:
+                if self._async_stylist is None:
+                    transport = AsyncGroqTransport(
+                        self.groq_api_key,
+                        base_url=Config.GROQ_BASE_URL,
+                        connect_timeout=Config.GROQ_CONNECT_TIMEOUT,
+                        read_timeout=Config.GROQ_READ_TIMEOUT,
+                        max_retries=Config.GROQ_MAX_RETRIES,
+                        max_connections=Config.ASYNC_GROQ_POOL_SIZE,
+                        max_keepalive=Config.ASYNC_GROQ_POOL_SIZE,
+                        breaker=self.transport.breaker
+                    )
+                    self._async_stylist = AsyncGroqStylist(self.groq_stylist, transport,
+                                                           executor=self.cpu_executor)
+        return self._async_stylist
     
-    def process_user_request(self, image_path, gender, dress_code, preferences=""):
+    async def close_async(self):
+        """Close the asyncio client's connections, if it was ever built"""
+        if self._async_stylist is not None:
+            await self._async_stylist.transport.close()
+    
+    def process_user_request(self, image_path, gender, dress_code, preferences="", latency_budget=None):
         """
         Main processing function that combines image analysis with AI recommendations
+        latency_budget (seconds) overrides the router's default for this request
         """
         try:
-            # Step 1: Analyze skin tone from image
-            skin_tone, confidence, color_palette = self.image_processor.analyze_skin_tone(image_path)
-            
-            # Step 2: Convert image to base64 for API
-            image_base64 = self.image_processor.get_image_base64(image_path)
+            # Steps 1-4: decode, near-duplicate lookup, face/skin/garment analysis, encode
+            local = self._analyze_locally(image_path, gender, dress_code, preferences)
+            if local["cached"] is not None:
+                return local["cached"]
             
-            # Step 3: Get AI recommendations
-            ai_recommendations = self.groq_stylist.analyze_image_and_recommend(
-                image_base64, skin_tone, gender, dress_code, preferences
+            # Step 5: Get AI recommendations over the route that fits the budget
+            ai_recommendations, routing = self._routed_recommendations(
+                local, gender, dress_code, preferences, latency_budget
             )
             
-            # Step 4: Combine all results
-            result = {
-                "skin_analysis": {
-                    "detected_tone": skin_tone,
-                    "confidence": confidence,
-                    "color_palette": color_palette
-                },
-                "ai_recommendations": ai_recommendations,
-                "user_inputs": {
-                    "gender": gender,
-                    "dress_code": dress_code,
-                    "preferences": preferences
-                }
-            }
-            
-            return result
-            
+            # Step 6: Combine all results
+            return self._assemble_result(local, ai_recommendations, routing, gender, dress_code, preferences)
+        
+        except AdmissionRejected:
+            raise
         except Exception as e:
             # Fallback processing without image analysis
             return self._fallback_processing(gender, dress_code, preferences)
     
-    def _fallback_processing(self, gender, dress_code, preferences):
+    async def process_user_request_async(self, image_path, gender, dress_code, preferences="", latency_budget=None):
+        """
+        Asyncio variant of process_user_request for the ASGI serving mode: the
+        CPU-bound image work runs on cpu_executor and the Groq calls on the event loop
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            local = await loop.run_in_executor(
+                self.cpu_executor, self._analyze_locally, image_path, gender, dress_code, preferences
+            )
+            if local["cached"] is not None:
+                return local["cached"]
+            
+            ai_recommendations, routing = await self._routed_recommendations_async(
+                local, gender, dress_code, preferences, latency_budget
+            )
+            return await loop.run_in_executor(
+                self.cpu_executor, self._assemble_result, local, ai_recommendations, routing,
+                gender, dress_code, preferences
+            )
+        
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            basic_tips = await self.async_stylist.get_fashion_tips(self.FALLBACK_TONE, gender, dress_code)
+            return self._fallback_processing(gender, dress_code, preferences, basic_tips=basic_tips)
+    
+    def stream_user_request(self, image_path, gender, dress_code, preferences="", latency_budget=None):
+        """
+        Streaming variant of process_user_request
+        Yields ("skin_analysis", dict) and ("color_match", dict) as soon as local
+        analysis is done, then the stylist's ("token", text) / ("section", (name, value))
+        events, and finally ("done", result) with the same shape process_user_request returns
+        """
+        try:
+            local = self._analyze_locally(image_path, gender, dress_code, preferences)
+            cached = local["cached"]
+        except Exception:
+            cached = self._fallback_processing(gender, dress_code, preferences)
+        
+        # Duplicates and fallbacks are already complete: replay them as sections
+        if cached is not None:
+            yield "skin_analysis", cached["skin_analysis"]
+            if cached.get("color_match"):
+                yield "color_match", cached["color_match"]
+            for section in cached["ai_recommendations"].items():
+                yield "section", section
+            yield "done", cached
+            return
+        
+        yield "skin_analysis", local["skin_analysis"]
+        if local["color_match"]:
+            yield "color_match", local["color_match"]
+        
+        # A route that fails before any token is out is retried text-only, as in
+        # _routed_recommendations; once tokens are out the stream has to finish
+        route, routing = self.router.choose(latency_budget)
+        deadline = time.perf_counter() + routing["budget_s"]
+        while route is not None:
+            start = time.perf_counter()
+            timeout = self._route_timeout(route, deadline)
+            streamed, error = False, None
+            try:
+                for event, payload in self._stream_route(route, local, gender, dress_code, preferences, timeout):
+                    if event == "done":
+                        recommendations = payload
+                    elif event == "error" and not streamed:
+                        # Held back while another route may still answer
+                        error = payload
+                    else:
+                        streamed = True
+                        yield event, payload
+            except AdmissionRejected as e:
+                # Shed locally before the call: not a verdict on the route's health
+                yield "error", str(e)
+                recommendations = self.groq_stylist._fallback_recommendations(local["skin_tone"], e)
+                break
+            
+            route = self._next_route(route, routing, recommendations, start, timeout, retry=not streamed)
+            if route is None and error is not None:
+                yield "error", error
+        
+        yield "done", self._assemble_result(local, recommendations, routing, gender, dress_code, preferences)
+    
+    def _stream_route(self, route, local, gender, dress_code, preferences, timeout=None):
+        """Streaming variant of _call_route"""
+        if route.vision:
+            return self.groq_stylist.stream_image_recommendations(
+                local["image_base64"], local["skin_tone"], gender, dress_code, preferences,
+                mime_type=local["mime_type"], model=route.model, timeout=timeout
+            )
+        return self.groq_stylist.stream_local_analysis_recommendations(
+            local["skin_tone"], gender, dress_code, preferences, garment_colors=local["garment_colors"],
+            timeout=timeout
+        )
+    
+    def _analyze_locally(self, image_path, gender, dress_code, preferences):
+        """
+        The CPU-bound part of an analysis: decode, near-duplicate lookup, face
+        detection, skin tone, garment colors and re-encoding the crop
+        Returns: dict whose "cached" is a near-duplicate's stored result, if any
+        """
+        # Step 1: Decode and normalize the upload once, in memory
+        with timed("image_normalize"):
+            image = self.image_processor.normalize_image(image_path)
+        
+        # Reuse the stored result for near-duplicates of an earlier upload
+        local = {"cached": None, "image_hash": None, "dedup_key": None}
+        if self.dedup_index is not None:
+            with timed("dedup_lookup"):
+                local["image_hash"] = self.image_processor.perceptual_hash(image)
+                local["dedup_key"] = PerceptualHashIndex.make_key(gender, dress_code, preferences)
+                cached, distance = self.dedup_index.lookup(local["image_hash"], local["dedup_key"])
+            if cached is not None:
+                cached["duplicate_of_previous"] = {"hash_distance": distance}
+                local["cached"] = cached
+                return local
+        
+        # Step 2: Find the face (skin sampling) and upper body (sent to the model)
+        with timed("face_detection"):
+            skin_region, vision_region, face_box = self.image_processor.regions_of_interest(image)
+        
+        # Step 3: Analyze skin tone from the face region
+        with timed("skin_analysis"):
+            skin_tone, confidence, color_palette = self.image_processor.analyze_skin_tone(skin_region)
+        
+        # Garment colors vs. the palette for that tone (local, no tokens)
+        with timed("color_match"):
+            color_match = self.image_processor.color_match(image, skin_tone, face_box)
+        
+        # Step 4: Re-encode the cropped region to base64 for API
+        with timed("image_encode"):
+            image_base64, mime_type = self.image_processor.get_image_base64(vision_region)
+        
+        local.update({
+            "skin_tone": skin_tone,
+            "skin_analysis": {
+                "detected_tone": skin_tone,
+                "confidence": confidence,
+                "color_palette": color_palette,
+                "face_detected": face_box is not None
+            },
+            "color_match": color_match,
+            "garment_colors": (color_match or {}).get("colors"),
+            "image_base64": image_base64,
+            "mime_type": mime_type
+        })
+        return local
+    
+    def _assemble_result(self, local, ai_recommendations, routing, gender, dress_code, preferences):
+        """The full result for a local analysis and its recommendations (remembered for near-duplicates)"""
+        result = {
+            "skin_analysis": local["skin_analysis"],
+            "ai_recommendations": ai_recommendations,
+            "color_match": local["color_match"],
+            "routing": routing,
+            "user_inputs": {
+                "gender": gender,
+                "dress_code": dress_code,
+                "preferences": preferences
+            }
+        }
+        
+        # Only successful, full-quality upstream analyses are worth reusing
+        if self.dedup_index is not None and "error" not in ai_recommendations and not routing["degraded"]:
+            self.dedup_index.add(local["image_hash"], local["dedup_key"], result)
+        
+        return result
+    
+    def _routed_recommendations(self, local, gender, dress_code, preferences, latency_budget=None):
+        """
+        Core recommendations over the route the router picks, retried text-only
+        (with the local analysis) if a vision route fails or runs out of budget
+        Returns: (ai_recommendations, routing metadata)
+        """
+        route, routing = self.router.choose(latency_budget)
+        deadline = time.perf_counter() + routing["budget_s"]
+        while route is not None:
+            start = time.perf_counter()
+            timeout = self._route_timeout(route, deadline)
+            recommendations = self._call_route(
+                self.groq_stylist, route, local, gender, dress_code, preferences, timeout
+            )
+            route = self._next_route(route, routing, recommendations, start, timeout)
+        return recommendations, routing
+    
+    async def _routed_recommendations_async(self, local, gender, dress_code, preferences, latency_budget=None):
+        """Asyncio variant of _routed_recommendations (same routing decisions)"""
+        route, routing = self.router.choose(latency_budget)
+        deadline = time.perf_counter() + routing["budget_s"]
+        while route is not None:
+            start = time.perf_counter()
+            timeout = self._route_timeout(route, deadline)
+            recommendations = await self._call_route(
+                self.async_stylist, route, local, gender, dress_code, preferences, timeout
+            )
+            route = self._next_route(route, routing, recommendations, start, timeout)
+        return recommendations, routing
+    
+    def _route_timeout(self, route, deadline):
+        """
+        Seconds a call on route may take: vision calls get what is left of the
+        latency budget (at least ModelRouter.MIN_ROUTE_TIMEOUT), so a slow vision model
+        falls back to text in time. Text-only calls are the last resort and
+        keep the transport's own deadlines.
+        """
+        if not route.vision:
+            return None
+        return max(self.router.MIN_ROUTE_TIMEOUT, deadline - time.perf_counter())
+    
+    def _call_route(self, stylist, route, local, gender, dress_code, preferences, timeout=None):
+        """
+        Core recommendations from stylist over one route: the image for vision
+        routes, the local analysis otherwise (a coroutine for AsyncGroqStylist)
+        """
+        if route.vision:
+            return stylist.analyze_image_and_recommend(
+                local["image_base64"], local["skin_tone"], gender, dress_code, preferences,
+                mime_type=local["mime_type"], model=route.model, timeout=timeout
+            )
+        return stylist.recommend_from_local_analysis(
+            local["skin_tone"], gender, dress_code, preferences, garment_colors=local["garment_colors"],
+            timeout=timeout
+        )
+    
+    def _next_route(self, route, routing, recommendations, start, timeout=None, retry=True):
+        """
+        Record a route's call (started at start, limited to timeout seconds)
+        Returns: the route to retry on, or None when done
+        """
+        elapsed = time.perf_counter() - start
+        failed = "error" in recommendations
+        # A call cut short by the budget was slow rather than broken: its time feeds the latency estimate
+        timed_out = failed and timeout is not None and elapsed >= timeout
+        self.router.record(route, elapsed if timed_out or not failed else None, error=failed and not timed_out)
+        
+        if not failed or not route.vision or not retry:
+            return None
+        return self.router.fallback(route, routing, timed_out=timed_out)
+    
+    def _fallback_processing(self, gender, dress_code, preferences, basic_tips=None):
         """
         Fallback processing when image analysis fails
         """
+        FALLBACKS.inc(reason="image_processing")
+        
         # Default skin tone analysis
-        default_tone = "Medium"
+        default_tone = self.FALLBACK_TONE
         default_palette = self.image_processor._get_palette(default_tone)
         
-        # Get basic recommendations from Groq
-        basic_tips = self.groq_stylist.get_fashion_tips(default_tone, gender, dress_code)
+        # Get basic recommendations from Groq (async callers fetch them first)
+        if basic_tips is None:
+            basic_tips = self.groq_stylist.get_fashion_tips(default_tone, gender, dress_code)
         
         return {
             "skin_analysis": {
@@ -84,31 +417,122 @@ class FashionRecommender:
         """
         try:
             tips = self.groq_stylist.get_fashion_tips(skin_tone, gender, dress_code)
-            palette = self.image_processor._get_palette(skin_tone)
-            
+            return self._quick_result(skin_tone, gender, dress_code, tips)
+        except AdmissionRejected:
+            raise
+        except Exception as e:
             return {
-                "skin_tone": skin_tone,
-                "color_palette": palette,
-                "fashion_tips": tips,
-                "quick_recommendations": {
+                "error": str(e),
+                "skin_analysis": {
+                    "detected_tone": skin_tone,
+                    "color_palette": self.image_processor._get_palette(skin_tone)
+                },
+                "ai_recommendations": {},
+                "user_inputs": {
+                    "gender": gender,
+                    "dress_code": dress_code
+                }
+            }
+    
+    def stream_quick_recommendations(self, skin_tone, gender, dress_code):
+        """
+        Streaming variant of get_quick_recommendations
+        Yields ("skin_analysis", dict), ("token", text) events and finally ("done", result)
+        """
+        palette = self.image_processor._get_palette(skin_tone)
+        yield "skin_analysis", {"detected_tone": skin_tone, "color_palette": palette}
+        
+        for event, payload in self.groq_stylist.stream_fashion_tips(skin_tone, gender, dress_code):
+            if event != "done":
+                yield event, payload
+                continue
+            
+            yield "done", self._quick_result(skin_tone, gender, dress_code, payload)
+    
+    def _quick_result(self, skin_tone, gender, dress_code, tips):
+        """Quick recommendations result around the tips text (same for both paths, so both can be stored)"""
+        return {
+            "skin_analysis": {
+                "detected_tone": skin_tone,
+                "color_palette": self.image_processor._get_palette(skin_tone)
+            },
+            "ai_recommendations": {
+                "basic_tips": tips,
+                "outfit_recommendations": {
                     "tops": ["Essential pieces for your skin tone"],
                     "bottoms": ["Versatile options"],
                     "accessories": ["Complementary accessories"]
                 }
+            },
+            "user_inputs": {
+                "gender": gender,
+                "dress_code": dress_code
             }
-        except Exception as e:
-            return {
-                "error": str(e),
-                "skin_tone": skin_tone,
-                "color_palette": self.image_processor._get_palette(skin_tone)
+        }
+    
+    def generate_sections(self, result, names, max_workers=None):
+        """
+        Generate secondary sections for a finished analysis in parallel.
+        Returns (sections, errors), both keyed by section name.
+        """
+        user_inputs = result.get("user_inputs", {})
+        analysis = {
+            "skin_analysis": result.get("skin_analysis", {}),
+            # Core sections only; fallback notes and raw answers add nothing
+            "recommendations": {
+                name: value for name, value in result.get("ai_recommendations", {}).items()
+                if name not in ("error", "raw_response")
+            }
+        }
+        
+        sections, errors = {}, {}
+        workers = max(1, min(len(names), max_workers or Config.SECTION_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(
+                    self.groq_stylist.generate_section, name, analysis,
+                    user_inputs.get("gender"), user_inputs.get("dress_code"), user_inputs.get("preferences", "")
+                )
+                for name in names
             }
+            for name, future in futures.items():
+                try:
+                    sections[name] = future.result()
+                except AdmissionRejected:
+                    raise
+                except Exception as e:
+                    errors[name] = str(e)
+        
+        return sections, errors
+    
+    def warm_tips_cache(self, force=False, max_workers=4):
+        """
+        Pre-generate fashion tips for every skin tone / gender / dress code
+        combination. Returns the number of combinations newly cached.
+        """
+        combinations = [
+            (skin_tone, gender, dress_code)
+            for skin_tone in Config.SKIN_TONES
+            for gender in Config.GENDERS
+            for dress_code in Config.DRESS_CODES
+        ]
+        if force:
+            self.tips_cache.clear()
+        else:
+            combinations = [
+                combo for combo in combinations
+                if ResponseCache.make_key("tips", *combo) not in self.tips_cache
+            ]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda combo: self.groq_stylist.get_fashion_tips(*combo), combinations))
+        
+        return sum(1 for combo in combinations if ResponseCache.make_key("tips", *combo) in self.tips_cache)
     
     def validate_inputs(self, gender, dress_code):
         """
         Validate user inputs
         """
-        from config import Config
-        
         if gender not in Config.GENDERS:
             return False, f"Invalid gender. Choose from: {', '.join(Config.GENDERS)}"
         
@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+import time
+
+from utils.db import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at);
+CREATE TABLE IF NOT EXISTS sections (
+    result_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (result_id, name)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result_id TEXT,
+    error TEXT
+);
+"""
+
+JOB_FIELDS = ("id", "status", "created_at", "started_at", "finished_at", "result_id", "error")
+
+
+class ResultStore:
+    """
+    SQLite store of finished results (compact JSON payloads) and the secondary
+    sections generated for them, so result pages can be revisited and shared
+    without another upstream call. Entries expire after ttl seconds. Job-mode
+    status records live here too, so any worker can answer a status poll.
+    """
+    def __init__(self, path, ttl=30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.db = SQLiteDatabase(path, SCHEMA)
+        self._pruner = None
+
+    @staticmethod
+    def _dumps(value):
+        return json.dumps(value, separators=(",", ":"))
+
+    def put(self, result_id, result, kind="analysis"):
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (id, kind, created_at, payload) VALUES (?, ?, ?, ?)",
+                (result_id, kind, time.time(), self._dumps(result))
+            )
+            # An id can come back after its result expired; the old sections belong to the old result
+            conn.execute("DELETE FROM sections WHERE result_id = ?", (result_id,))
+
+    def get(self, result_id):
+        """Return (kind, result), or (None, None) if missing or expired"""
+        row = self.db.connect().execute(
+            "SELECT kind, payload FROM results WHERE id = ? AND created_at >= ?",
+            (result_id, time.time() - self.ttl)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def __contains__(self, result_id):
+        return self.get(result_id)[0] is not None
+
+    def put_section(self, result_id, name, value):
+        with self.db.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sections (result_id, name, payload) VALUES (?, ?, ?)",
+                (result_id, name, self._dumps(value))
+            )
+
+    def get_section(self, result_id, name):
+        """A stored section value, or None"""
+        row = self.db.connect().execute(
+            "SELECT payload FROM sections WHERE result_id = ? AND name = ?", (result_id, name)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_job(self, job):
+        """Insert a job record (a dict with the JOB_FIELDS)"""
+        with self.db.connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' * len(JOB_FIELDS))})",
+                tuple(job.get(field) for field in JOB_FIELDS)
+            )
+
+    def update_job(self, job_id, **fields):
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self.db.connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get_job(self, job_id):
+        """A job record as a dict, or None"""
+        row = self.db.connect().execute(
+            f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return dict(zip(JOB_FIELDS, row)) if row is not None else None
+
+    def job_counts(self):
+        """Counts of job records by status"""
+        return dict(self.db.connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def prune_jobs(self, before):
+        """Delete job records finished (or, if never finished, created) before the given time"""
+        with self.db.connect() as conn:
+            return conn.execute("DELETE FROM jobs WHERE COALESCE(finished_at, created_at) < ?", (before,)).rowcount
+
+    def prune(self):
+        """Delete expired results and their sections. Returns the number of results removed"""
+        with self.db.connect() as conn:
+            removed = conn.execute(
+                "DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            conn.execute("DELETE FROM sections WHERE result_id NOT IN (SELECT id FROM results)")
+        return removed
+
+    def start_pruner(self, interval=3600):
+        """Run prune() every interval seconds on a daemon thread"""
+        if self._pruner is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.prune()
+                except sqlite3.Error as e:
+                    print(f"Warning: Result store prune failed: {e}")
+                time.sleep(interval)
+
+        self._pruner = threading.Thread(target=run, name="styleai-result-pruner", daemon=True)
+        self._pruner.start()
@@ -0,0 +1,129 @@
+import math
+import threading
+import time
+
+from utils.metrics import ROUTE_DECISIONS
+
+
+class Route:
+    """
+    One way to answer an image analysis (a model and whether it sees the
+    image), with exponentially weighted latency and error rate of recent calls
+    """
+    def __init__(self, name, model, vision, alpha=0.2):
+        self.name = name
+        self.model = model
+        self.vision = vision
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.updated_at = None
+
+    def observe(self, latency=None, error=False):
+        """Fold in one call: its latency (successful calls) and whether it failed"""
+        self.error_rate += self.alpha * ((1.0 if error else 0.0) - self.error_rate)
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        self.updated_at = time.monotonic()
+
+    def snapshot(self):
+        return {
+            "model": self.model,
+            "vision": self.vision,
+            "latency_s": round(self.latency, 3) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3)
+        }
+
+
+class ModelRouter:
+    """
+    Picks the most capable route expected to answer within a latency budget.
+    Routes are tried in preference order; one is skipped when its recent
+    latency exceeds the budget or its error rate is above max_error_rate.
+    Skipped routes get a probe call once their stats are probe_interval
+    seconds old, so a recovered model is noticed. If nothing fits, the
+    fastest healthy route (usually text-only) is used.
+    """
+    # Shortest timeout given to a vision call, and the least budget a request may ask for
+    MIN_ROUTE_TIMEOUT = 1.0
+
+    def __init__(self, routes, budget=12.0, max_error_rate=0.5, probe_interval=30.0):
+        self.routes = routes
+        self.budget = budget
+        self.max_error_rate = max_error_rate
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+
+    def clamp_budget(self, budget):
+        """
+        A requested budget limited to [MIN_ROUTE_TIMEOUT, configured budget],
+        so a request cannot hold a worker longer than the operator allows
+        """
+        if budget is None or not math.isfinite(budget):
+            return self.budget
+        return min(max(budget, self.MIN_ROUTE_TIMEOUT), self.budget)
+
+    def choose(self, budget=None):
+        """
+        Route for one request
+        Returns: (route, decision) where decision is the metadata attached to the result
+        """
+        budget = self.clamp_budget(budget)
+        now = time.monotonic()
+        with self._lock:
+            chosen, reason = None, None
+            for route in self.routes:
+                if route.latency is None and route.error_rate == 0.0:
+                    chosen, reason = route, "no_history"
+                elif route.error_rate > self.max_error_rate or route.latency is None or route.latency > budget:
+                    if now - route.updated_at >= self.probe_interval:
+                        # Count the probe now so concurrent requests do not all probe
+                        route.updated_at = now
+                        chosen, reason = route, "probe"
+                    else:
+                        continue
+                else:
+                    chosen, reason = route, "within_budget"
+                break
+
+            if chosen is None:
+                healthy = [r for r in self.routes if r.error_rate <= self.max_error_rate] or self.routes
+                chosen = min(healthy, key=lambda r: r.latency if r.latency is not None else float("inf"))
+                reason = "over_budget"
+
+            decision = {
+                "route": chosen.name,
+                "model": chosen.model,
+                "reason": reason,
+                "budget_s": budget,
+                "expected_s": round(chosen.latency, 3) if chosen.latency is not None else None,
+                # Answers from a lesser route are not reused for later requests
+                "degraded": chosen is not self.routes[0]
+            }
+        ROUTE_DECISIONS.inc(route=chosen.name, reason=reason)
+        return chosen, decision
+
+    def fallback(self, failed, decision, timed_out=False):
+        """
+        The route to retry on after `failed` errored or ran out of budget: the
+        first healthy text-only route, or None. Updates decision to record the retry.
+        """
+        with self._lock:
+            route = next((r for r in self.routes if not r.vision and r is not failed
+                          and r.error_rate <= self.max_error_rate), None)
+        if route is None:
+            return None
+        reason = f"{failed.name}_timeout" if timed_out else f"{failed.name}_failed"
+        ROUTE_DECISIONS.inc(route=route.name, reason=reason)
+        decision.update(route=route.name, model=route.model, reason=reason,
+                        failed_route=failed.name, degraded=True,
+                        expected_s=round(route.latency, 3) if route.latency is not None else None)
+        return route
+
+    def record(self, route, latency=None, error=False):
+        with self._lock:
+            route.observe(latency, error)
+
+    def snapshot(self):
+        with self._lock:
+            return {"budget_s": self.budget, "routes": {r.name: r.snapshot() for r in self.routes}}
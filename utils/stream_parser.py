@@ -0,0 +1,67 @@
+import json
+
+
+class JSONSectionParser:
+    """
+    Incremental parser for a streamed JSON object: feed() it text chunks as
+    they arrive and it returns each top-level (key, value) member as soon as
+    that member is complete. Text before the first '{' (e.g. a markdown
+    fence) is ignored.
+    """
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = None
+        self.finished = False
+
+    def feed(self, chunk):
+        """Consume a chunk of text; returns a list of completed (key, value) pairs"""
+        self.buffer += chunk
+        sections = []
+
+        while self._pos < len(self.buffer) and not self.finished:
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._depth > 0:
+                    self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 1:
+                    if char != "{":
+                        # Top-level array; not a sectioned object
+                        self.finished = True
+                        break
+                    self._member_start = self._pos + 1
+            elif char in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._emit(self._pos, sections)
+                    self.finished = True
+            elif char == "," and self._depth == 1:
+                self._emit(self._pos, sections)
+                self._member_start = self._pos + 1
+
+            self._pos += 1
+
+        return sections
+
+    def _emit(self, end, sections):
+        member = self.buffer[self._member_start:end].strip()
+        if not member:
+            return
+        try:
+            parsed = json.loads("{" + member + "}")
+        except ValueError:
+            return
+        sections.extend(parsed.items())
@@ -0,0 +1,276 @@
+import asyncio
+import contextlib
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+from groq import AsyncGroq, Groq, APIConnectionError, APIStatusError, APITimeoutError
+
+from utils.metrics import API_ERRORS, record_usage, timed
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit breaker is open"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. After failure_threshold failures the
+    circuit opens and calls fail fast; after reset_timeout seconds a single
+    probe call is let through (half-open) and its outcome closes or re-opens it.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """Whether a call may go to the upstream now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """Give back a half-open probe that ended without an outcome (e.g. it was cancelled)"""
+        with self._lock:
+            self._probing = False
+
+
+class GroqTransport:
+    """
+    Wraps chat.completions.create with explicit deadlines, a shared pooled
+    HTTP client, jittered exponential retries for 429/5xx/connection errors
+    (honoring Retry-After) and a circuit breaker.
+    """
+    RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+    # Overridden by AsyncGroqTransport
+    http_client_class = httpx.Client
+    client_class = Groq
+
+    def __init__(self, api_key, base_url=None, connect_timeout=5.0, read_timeout=60.0,
+                 max_retries=2, backoff_base=0.5, backoff_max=8.0,
+                 max_connections=20, max_keepalive=10, breaker=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http_client = self.http_client_class(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        )
+        # Retries are handled here so they can feed the circuit breaker
+        self.client = self.client_class(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=0,
+            http_client=self.http_client
+        )
+
+    def create(self, **kwargs):
+        """
+        chat.completions.create with retries; raises CircuitOpenError when degraded.
+        A timeout (seconds) bounds the call including its retries.
+        """
+        with self._call(kwargs):
+            response = self._create_with_retries(**kwargs)
+        return self._completed(kwargs, response)
+
+    def _create_with_retries(self, **kwargs):
+        deadline = self._deadline(kwargs)
+        attempt = 0
+        while True:
+            try:
+                response = self.client.chat.completions.create(**self._attempt(kwargs, deadline))
+            except Exception as e:
+                delay = self._retry_or_raise(e, attempt, deadline)
+            else:
+                self.breaker.record_success()
+                return response
+
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.http_client.close()
+
+    @contextlib.contextmanager
+    def _call(self, kwargs):
+        """Circuit check, timing and error metrics around one create()"""
+        model = kwargs.get("model")
+        if not self.breaker.allow():
+            API_ERRORS.inc(model=model, error="CircuitOpenError")
+            raise CircuitOpenError("Groq API is unavailable (circuit open), using fallback recommendations")
+
+        try:
+            with timed("llm_call"):
+                yield
+        except Exception as e:
+            API_ERRORS.inc(model=model, error=type(e).__name__)
+            raise
+
+    @staticmethod
+    def _completed(kwargs, response):
+        # Streamed responses report usage on their final chunk instead
+        if not kwargs.get("stream"):
+            record_usage(kwargs.get("model"), getattr(response, "usage", None))
+        return response
+
+    @staticmethod
+    def _deadline(kwargs):
+        """Monotonic deadline for a call with a timeout, or None"""
+        timeout = kwargs.get("timeout")
+        return time.monotonic() + timeout if timeout is not None else None
+
+    def _attempt(self, kwargs, deadline):
+        """
+        Arguments for one attempt: the client's connect and read timeouts,
+        shortened to whatever is left until the deadline
+        """
+        if deadline is None:
+            return kwargs
+        remaining = max(0.001, deadline - time.monotonic())
+        timeout = httpx.Timeout(min(self.read_timeout, remaining), connect=min(self.connect_timeout, remaining))
+        return dict(kwargs, timeout=timeout)
+
+    def _retry_or_raise(self, error, attempt, deadline=None):
+        """
+        Circuit breaker bookkeeping for a failed attempt: returns the delay
+        before the next one, or re-raises error once it is final
+        """
+        if deadline is not None and isinstance(error, APITimeoutError) and time.monotonic() >= deadline:
+            # The caller's own deadline ran out, which says nothing certain about upstream health
+            self.breaker.release()
+            raise error
+
+        if isinstance(error, APIStatusError):
+            if error.status_code not in self.RETRYABLE_STATUS:
+                # Client errors say nothing about upstream health
+                self.breaker.record_success()
+                raise error
+            delay = self._retry_delay(attempt, error.response)
+        elif isinstance(error, APIConnectionError):
+            # Includes APITimeoutError
+            delay = self._retry_delay(attempt)
+        else:
+            # Malformed responses and the like: never leave a half-open probe outstanding
+            delay = None
+
+        if delay is not None and deadline is not None and time.monotonic() + delay >= deadline:
+            delay = None
+        if delay is None:
+            self.breaker.record_failure()
+            raise error
+        return delay
+
+    def _retry_delay(self, attempt, response=None):
+        """Seconds to wait before the next attempt, or None to give up"""
+        if attempt >= self.max_retries:
+            return None
+
+        retry_after = self._retry_after(response) if response is not None else None
+        if retry_after is not None:
+            # Waiting longer than our own backoff cap would just tie up the thread
+            return retry_after if retry_after <= self.backoff_max else None
+
+        # Full jitter: uniform over [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response):
+        """Parse retry-after-ms / Retry-After (seconds or HTTP date) headers"""
+        headers = response.headers
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000.0
+            value = headers.get("retry-after")
+            if value is None:
+                return None
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class AsyncGroqTransport(GroqTransport):
+    """
+    GroqTransport for the asyncio client: the same deadlines, retries and
+    circuit breaker (pass the sync transport's breaker to share its view of
+    upstream health), with awaitable create() and non-blocking backoff
+    """
+    http_client_class = httpx.AsyncClient
+    client_class = AsyncGroq
+
+    def __init__(self, api_key, max_connections=200, max_keepalive=50, **kwargs):
+        super().__init__(api_key, max_connections=max_connections, max_keepalive=max_keepalive, **kwargs)
+
+    async def create(self, **kwargs):
+        """
+        chat.completions.create with retries; raises CircuitOpenError when degraded.
+        A timeout (seconds) bounds the call including its retries.
+        """
+        with self._call(kwargs):
+            response = await self._create_with_retries(**kwargs)
+        return self._completed(kwargs, response)
+
+    async def _create_with_retries(self, **kwargs):
+        deadline = self._deadline(kwargs)
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await self.client.chat.completions.create(**self._attempt(kwargs, deadline))
+                except Exception as e:
+                    delay = self._retry_or_raise(e, attempt, deadline)
+                else:
+                    self.breaker.record_success()
+                    return response
+
+                await asyncio.sleep(delay)
+                attempt += 1
+        except asyncio.CancelledError:
+            # The client went away mid-call or mid-backoff: no verdict on the upstream either way
+            self.breaker.release()
+            raise
+
+    async def close(self):
+        await self.http_client.aclose()
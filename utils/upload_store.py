@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+import time
+
+
+class UploadStore:
+    """
+    Content-addressed store for uploads that need to be displayed. Files are
+    named by a hash of their bytes, so re-uploads of the same photo share one
+    file. A background sweeper bounds the store by age and total size.
+    """
+    def __init__(self, folder, max_age=7 * 24 * 3600, max_bytes=1024 * 1024 * 1024):
+        self.folder = folder
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._sweeper = None
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def digest(data):
+        """Content hash used as the stored file name"""
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def save(self, data, extension):
+        """Persist bytes (once per content) and return the stored file name"""
+        extension = extension.lower().lstrip(".")
+        if extension == "jpeg":
+            extension = "jpg"
+        filename = f"{self.digest(data)}.{extension}"
+        path = os.path.join(self.folder, filename)
+
+        if os.path.exists(path):
+            # Refresh the age so the sweeper keeps recently used uploads
+            os.utime(path, None)
+            return filename
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return filename
+
+    def path(self, filename):
+        return os.path.join(self.folder, filename)
+
+    def sweep(self):
+        """
+        Delete files older than max_age, then the oldest files until the store
+        fits in max_bytes. Returns the number of files removed.
+        """
+        entries = []
+        for entry in os.scandir(self.folder):
+            if not entry.is_file() or entry.name.startswith("."):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+        cutoff = time.time() - self.max_age
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        return removed
+
+    def start_sweeper(self, interval=600):
+        """Run sweep() every interval seconds on a daemon thread"""
+        if self._sweeper is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except OSError as e:
+                    print(f"Warning: Upload sweep failed: {e}")
+                time.sleep(interval)
+
+        self._sweeper = threading.Thread(target=run, name="styleai-upload-sweeper", daemon=True)
+        self._sweeper.start()